@@ -3,24 +3,67 @@
 处理群聊加群请求的自动审核功能
 """
 import asyncio
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
 
-from .function.apifox_model import ApifoxModel
+from .function.api_guard import UNAVAILABLE_ERRORS, ApiGuard
+from .function.group_profiles import REVIEW_FIELDS, ProfileIndex, parse_group_profiles
+from .function.metrics import metrics
+from .function.platform_adapter import PlatformRegistry
+from .function.rule_pipeline import ReviewContext, ReviewDecision, ReviewRule, RulePipeline
+from .function.text_normalize import TextNormalizer
+
+
+class ReviewProfile:
+    """单个群的加群审核配置及其编译出的审核规则流水线"""
+    
+    __slots__ = ("accept_keywords", "reject_keywords", "auto_reject", "reject_reason",
+                 "level_restriction", "level_reject_reason", "delay_seconds", "pipeline")
+    
+    def __init__(self, settings: Dict[str, Any], normalizer: TextNormalizer) -> None:
+        """
+        初始化审核配置
+        
+        Args:
+            settings: 合并后的配置，键见 REVIEW_FIELDS
+            normalizer: 文本规范化器，关键词在此处规范化一次
+        """
+        # 关键词列表：(原始关键词, 规范化后的关键词)
+        self.accept_keywords: List[Tuple[str, str]] = [
+            (keyword, normalizer.normalize(keyword)) for keyword in settings["AcceptKeywords"]
+        ]
+        self.reject_keywords: List[Tuple[str, str]] = [
+            (keyword, normalizer.normalize(keyword)) for keyword in settings["RejectKeywords"]
+        ]
+        self.auto_reject: bool = settings["AutoReject"]
+        self.reject_reason: str = settings["RejectReason"]
+        self.level_restriction: int = settings["LevelRestriction"]
+        self.level_reject_reason: str = settings["LevelRejectReason"]
+        self.delay_seconds: int = settings["DelaySeconds"]
+        self.pipeline: Optional[RulePipeline] = None
 
 
 class AppReview:
     """加群审核处理器"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], ban_manager=None, api_guard: Optional[ApiGuard] = None,
+                 normalizer: Optional[TextNormalizer] = None, platforms: Optional[PlatformRegistry] = None):
         """
         初始化加群审核模块
         
         Args:
             config: 插件配置
+            ban_manager: 黑名单管理器，提供时黑名单检查作为审核的第一条规则
+            api_guard: 协议端调用保护器，为空时自行创建
+            normalizer: 文本规范化器，为空时自行创建
+            platforms: 平台适配器缓存，为空时自行创建
         """
+        self.ban_manager = ban_manager
+        self.api_guard = api_guard or ApiGuard(config)
+        self.normalizer = normalizer or TextNormalizer(config)
+        self.platforms = platforms or PlatformRegistry(self.api_guard)
         self._load_config(config)
     
     def _load_config(self, config: Dict[str, Any]):
@@ -30,22 +73,48 @@ class AppReview:
         
         # 获取关键词配置
         keywords_config = automatic_review["AutomaticReview_KeywordsConfig"]
-        self.accept_keywords = keywords_config["KeywordsConfig_AcceptKeywords"]
         
         # 获取拒绝配置（新的配置结构）
         reject_config = keywords_config["KeywordsConfig_RejectConfig"]
-        self.reject_keywords = reject_config["RejectConfig_RejectKeywords"]
-        self.auto_reject = reject_config["RejectConfig_AutoReject"]
-        self.reject_reason = reject_config["RejectConfig_RejectReason"]
         
         # 获取等级限制配置
         level_config = automatic_review["AutomaticReview_LevelRestrictionsConfig"]
-        self.level_restriction = level_config["LevelRestrictionsConfig_Number"]
-        self.level_reject_reason = level_config["LevelRestrictionsConfig_RejectReason"]
         
-        # 获取其他配置
-        self.delay_seconds = automatic_review["AutomaticReview_DelaySeconds"]
+        # 获取突袭模式自动拒绝配置
+        raid_reject_config = config["RaidDetection"]["RaidDetection_AutoRejectConfig"]
+        self.raid_auto_reject = raid_reject_config["AutoRejectConfig_Enable"]
+        self.raid_auto_reject_reason = raid_reject_config["AutoRejectConfig_Reason"]
+        
         self.whitelist_groups = config["WhitelistGroups"]
+        
+        # 全局配置作为未单独配置的群的默认值，按群编译审核规则流水线
+        base_settings = {
+            "AcceptKeywords": keywords_config["KeywordsConfig_AcceptKeywords"],
+            "RejectKeywords": reject_config["RejectConfig_RejectKeywords"],
+            "AutoReject": reject_config["RejectConfig_AutoReject"],
+            "RejectReason": reject_config["RejectConfig_RejectReason"],
+            "LevelRestriction": level_config["LevelRestrictionsConfig_Number"],
+            "LevelRejectReason": level_config["LevelRestrictionsConfig_RejectReason"],
+            "DelaySeconds": automatic_review["AutomaticReview_DelaySeconds"],
+        }
+        self.profiles: ProfileIndex[ReviewProfile] = ProfileIndex(
+            base_settings, parse_group_profiles(config, base_settings), REVIEW_FIELDS, self._compile_profile
+        )
+        metrics.set_gauge("profiles.review.compiled", self.profiles.compiled_count)
+    
+    def _compile_profile(self, settings: Dict[str, Any]) -> ReviewProfile:
+        """
+        编译一份审核配置
+        
+        Args:
+            settings: 合并后的配置
+            
+        Returns:
+            带有审核规则流水线的审核配置
+        """
+        profile = ReviewProfile(settings, self.normalizer)
+        profile.pipeline = self._build_pipeline(profile)
+        return profile
     
     async def approve_request(self, event: AstrMessageEvent, flag: str, 
                              approve: bool = True, reason: str = "") -> bool:
@@ -61,47 +130,17 @@ class AppReview:
         Returns:
             操作是否成功
         """
-        try:
-            # 检查是否为aiocqhttp平台
-            if event.get_platform_name() == "aiocqhttp":
-                # 使用NapCat API格式
-                from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import AiocqhttpMessageEvent
-                assert isinstance(event, AiocqhttpMessageEvent)
-                client = event.bot
-                
-                # 创建ApifoxModel实例
-                api_model = ApifoxModel(
-                    approve=approve,
-                    flag=flag,
-                    reason=reason
-                )
-                
-                # 调用NapCat API
-                payloads = {
-                    "flag": api_model.flag,
-                    "sub_type": "add",
-                    "approve": api_model.approve,
-                    "reason": api_model.reason if api_model.reason else ""
-                }
-                
-                await client.call_action('set_group_add_request', **payloads)
-                return True
-            # 兼容其他平台的处理方式
-            elif event.bot and hasattr(event.bot, "call_action"):
-                await event.bot.call_action(
-                    "set_group_add_request",
-                    flag=flag,
-                    sub_type="add",
-                    approve=approve,
-                    reason=reason
-                )
-                return True
+        adapter = self.platforms.for_event(event)
+        if adapter is None:
             return False
+        try:
+            await adapter.set_group_add_request(flag, approve, reason)
+            return True
         except Exception as e:
-            logger.error(f"[Authenticator] 处理群聊申请失败: {e}")
+            logger.error(f"[Authenticator] 处理群聊申请失败: {type(e).__name__} {e}")
             return False
     
-    async def get_user_level(self, event: AstrMessageEvent, user_id: str) -> int:
+    async def get_user_level(self, event: AstrMessageEvent, user_id: str) -> Optional[int]:
         """
         获取用户的QQ等级
         
@@ -110,29 +149,17 @@ class AppReview:
             user_id: 用户ID
             
         Returns:
-            用户的QQ等级，如果获取失败返回0
+            用户的QQ等级，如果获取失败返回0；协议端不可用（熔断、超时或连接错误）时返回None
         """
-        # 检查是否为aiocqhttp平台
-        if event.get_platform_name() != "aiocqhttp":
-            logger.debug(f"[Authenticator] 插件仅支持 aiocqhttp 平台获取用户等级，当前平台: {event.get_platform_name()}，返回默认等级。")
+        adapter = self.platforms.for_event(event)
+        if adapter is None:
             return 0
             
         try:
-            # 使用NapCat API格式
-            from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import AiocqhttpMessageEvent
-            assert isinstance(event, AiocqhttpMessageEvent)
-            client = event.bot
-            
             logger.debug(f"[Authenticator] 开始获取用户 {user_id} 的QQ等级信息")
             
-            # 调用NapCat API获取用户信息 - 使用正确的API调用方式
-            payloads = {
-                "user_id": int(user_id),
-                "no_cache": True
-            }
-            logger.debug(f"[Authenticator] 调用get_stranger_info API，参数: {payloads}")
-            
-            user_info = await client.api.call_action('get_stranger_info', **payloads)
+            # 调用NapCat API获取用户信息
+            user_info = await adapter.get_stranger_info(int(user_id), no_cache=True)
             logger.debug(f"[Authenticator] API返回结果: {user_info}")
             
             if user_info:
@@ -146,6 +173,9 @@ class AppReview:
             else:
                 logger.debug(f"[Authenticator] API调用返回None或空结果")
                 
+        except UNAVAILABLE_ERRORS as e:
+            logger.warning(f"[Authenticator] 协议端暂不可用，无法获取用户 {user_id} 的QQ等级: {type(e).__name__} {e}")
+            return None
         except Exception as e:
             logger.error(f"[Authenticator] 获取用户 {user_id} 的QQ等级失败: {e}")
             logger.debug(f"[Authenticator] 异常详细信息:", exc_info=True)
@@ -153,16 +183,208 @@ class AppReview:
         logger.debug(f"[Authenticator] 最终返回默认等级: 0")
         return 0
 
+    def _build_pipeline(self, profile: ReviewProfile) -> RulePipeline:
+        """
+        按现有的判断优先级构建审核规则流水线
+        
+        Args:
+            profile: 审核配置
+        
+        优先级：黑名单 > 突袭模式自动拒绝 > 等级限制 > 拒绝关键词 > 同意关键词 > AutoReject
+        """
+        rules = []
+        
+        if self.ban_manager is not None:
+            ban_reject = ReviewDecision(False, self.ban_manager.reject_reason, "黑名单", delayed=False)
+            rules.append(ReviewRule(
+                "ban", ReviewRule.LOCAL,
+                lambda ctx: ban_reject if self.ban_manager.should_reject_join_request(ctx.user_id) else None,
+                ban_reject
+            ))
+        
+        if self.raid_auto_reject:
+            raid_reject = ReviewDecision(False, self.raid_auto_reject_reason, "突袭模式自动拒绝配置", delayed=False)
+            rules.append(ReviewRule(
+                "raid_auto_reject", ReviewRule.LOCAL,
+                lambda ctx: self._check_raid(ctx, raid_reject),
+                raid_reject
+            ))
+        
+        if profile.level_restriction > 0:
+            rules.append(ReviewRule(
+                "level", ReviewRule.REMOTE, lambda ctx: self._check_level(ctx, profile),
+                ReviewDecision(False, profile.level_reject_reason, "等级限制")
+            ))
+        
+        if profile.reject_keywords:
+            keyword_reject = ReviewDecision(False, profile.reject_reason)
+            rules.append(ReviewRule(
+                "reject_keywords", ReviewRule.LOCAL,
+                lambda ctx: self._match_keywords(ctx.comment, profile.reject_keywords, keyword_reject),
+                keyword_reject
+            ))
+        
+        if profile.accept_keywords:
+            keyword_accept = ReviewDecision(True)
+            rules.append(ReviewRule(
+                "accept_keywords", ReviewRule.LOCAL,
+                lambda ctx: self._match_keywords(ctx.comment, profile.accept_keywords, keyword_accept),
+                keyword_accept
+            ))
+        
+        if profile.auto_reject:
+            auto_reject = ReviewDecision(False, profile.reject_reason, "AutoReject配置")
+            rules.append(ReviewRule("auto_reject", ReviewRule.LOCAL, lambda ctx: auto_reject, auto_reject))
+        
+        return RulePipeline(rules)
+    
+    def _match_keywords(self, comment: str, keywords: List[Tuple[str, str]],
+                        decision: ReviewDecision) -> Optional[ReviewDecision]:
+        """
+        按顺序匹配关键词
+        
+        Args:
+            comment: 规范化后的验证信息
+            keywords: 关键词列表：(原始关键词, 规范化后的关键词)
+            decision: 命中时使用的审核结果
+            
+        Returns:
+            命中时返回带有关键词依据的审核结果，否则返回 None
+        """
+        for keyword, normalized in keywords:
+            if self._is_valid_keyword_match(comment, normalized):
+                return decision.with_label(f"关键词 '{keyword}' ")
+        return None
+    
+    @staticmethod
+    def _check_raid(ctx: ReviewContext, raid_reject: ReviewDecision) -> Optional[ReviewDecision]:
+        """
+        突袭模式自动拒绝规则
+        
+        黑名单规则在其之前求值且命中后不再执行本规则，因此命中即为最终结果，可直接计数
+        """
+        if not ctx.raid_mode:
+            return None
+        metrics.incr("raid.auto_rejected")
+        return raid_reject
+    
+    async def _check_level(self, ctx: ReviewContext, profile: ReviewProfile) -> Optional[ReviewDecision]:
+        """
+        检查等级限制
+        
+        Args:
+            ctx: 审核上下文
+            profile: 该群的审核配置
+            
+        Returns:
+            等级不足时返回拒绝结果，否则返回 None
+        """
+        if ctx.level_cache is None:
+            user_level = await self.get_user_level(ctx.event, ctx.user_id)
+        else:
+            # 同一批请求中同一用户只查询一次等级
+            task = ctx.level_cache.get(ctx.user_id)
+            if task is None:
+                task = ctx.level_cache[ctx.user_id] = asyncio.ensure_future(
+                    self.get_user_level(ctx.event, ctx.user_id)
+                )
+            user_level = await task
+        
+        if user_level is None:
+            # 协议端不可用时降级：跳过等级检查，由后续规则决定
+            metrics.incr("review.level.degraded")
+            logger.warning(f"[Authenticator] 协议端不可用，已跳过用户 {ctx.user_id} 的等级检查。")
+            return None
+        
+        logger.info(f"[Authenticator] 用户 {ctx.user_id} 的QQ等级为: {user_level}, 限制等级为: {profile.level_restriction}")
+        
+        if user_level < profile.level_restriction:
+            return ReviewDecision(False, profile.level_reject_reason, "等级限制")
+        return None
+    
+    @staticmethod
+    def _same_outcome(decision: ReviewDecision, other: ReviewDecision, raid_mode: bool) -> bool:
+        """
+        判断两个审核结果是否等价
+        
+        平时要求同意/拒绝、拒绝理由与是否延迟完全一致，保证与逐条判断的结果相同；
+        突袭模式下只要求同意/拒绝一致，已被拒绝的请求不再查询等级。
+        """
+        if raid_mode:
+            return decision.approve == other.approve
+        return (decision.approve == other.approve
+                and decision.reason == other.reason
+                and decision.delayed == other.delayed)
+    
+    async def evaluate_request(self, event: AstrMessageEvent, request_data: Dict[str, Any],
+                               raid_mode: bool = False,
+                               level_cache: Optional[Dict[str, asyncio.Task]] = None) -> Optional[ReviewDecision]:
+        """
+        对加群请求求值，不执行任何操作
+        
+        Args:
+            event: 消息事件
+            request_data: 请求数据
+            raid_mode: 该群是否处于突袭模式
+            level_cache: 批量审核时共享的等级查询任务
+            
+        Returns:
+            审核结果，未命中任何规则（等待手动审核）时返回 None
+        """
+        ctx = ReviewContext(
+            event,
+            str(request_data.get("user_id", "")),
+            str(request_data.get("group_id", "")),
+            # 验证信息在求值前规范化一次，所有关键词规则共用
+            self.normalizer.normalize(request_data.get("comment", "") or ""),
+            request_data.get("flag", ""),
+            raid_mode,
+            level_cache
+        )
+        profile = self.profiles.get(request_data.get("group_id"))
+        return await profile.pipeline.evaluate(
+            ctx, lambda decision, other: self._same_outcome(decision, other, raid_mode)
+        )
+    
+    async def apply_decision(self, event: AstrMessageEvent, request_data: Dict[str, Any],
+                             decision: Optional[ReviewDecision], wait: bool = True) -> None:
+        """
+        执行审核结果
+        
+        Args:
+            event: 消息事件
+            request_data: 请求数据
+            decision: 审核结果，为 None 时等待手动审核
+            wait: 是否在执行前等待配置的延迟时间，由调用方自行安排延迟时传入 False
+        """
+        user_id = request_data.get("user_id", "")
+        group_id = request_data.get("group_id", "")
+        
+        if decision is None:
+            # 不做任何处理，等待手动审核
+            logger.info(f"[Authenticator] 用户 {user_id} 加入群 {group_id} 的请求未匹配到任意关键词，等待手动审核。")
+            return
+        
+        action = "同意" if decision.approve else "拒绝"
+        delay_seconds = self.profiles.get(group_id).delay_seconds
+        if wait and decision.delayed and delay_seconds > 0:
+            logger.info(f"[Authenticator] 将在 {delay_seconds} 秒后根据{decision.label}{action}用户 {user_id} 加入群 {group_id} 的请求。")
+            await asyncio.sleep(delay_seconds)
+        
+        if await self.approve_request(event, request_data.get("flag", ""), decision.approve, decision.reason):
+            logger.info(f"[Authenticator] 已根据{decision.label}{action}用户 {user_id} 加入群 {group_id} 的请求。")
+    
     async def process_group_join_request(self, event: AstrMessageEvent, 
-                                        request_data: Dict[str, Any]) -> None:
+                                        request_data: Dict[str, Any],
+                                        raid_mode: bool = False) -> None:
         """
         处理加群请求
         
         Args:
             event: 消息事件
             request_data: 请求数据
+            raid_mode: 该群是否处于突袭模式
         """
-        flag = request_data.get("flag", "")
         user_id = request_data.get("user_id", "")
         comment = request_data.get("comment", "")
         group_id = request_data.get("group_id", "")
@@ -174,52 +396,8 @@ class AppReview:
         
         logger.info(f"[Authenticator] 收到加群请求: 用户ID={user_id}, 群ID={group_id}, 验证信息={comment}。")
         
-        # 获取延迟时间
-        delay_seconds = self.delay_seconds
-        
-        # 检查等级限制（如果启用了等级限制）
-        if self.level_restriction > 0:
-            user_level = await self.get_user_level(event, user_id)
-            logger.info(f"[Authenticator] 用户 {user_id} 的QQ等级为: {user_level}, 限制等级为: {self.level_restriction}")
-            
-            if user_level < self.level_restriction:
-                if delay_seconds > 0:
-                    logger.info(f"[Authenticator] 将在 {delay_seconds} 秒后根据等级限制拒绝用户 {user_id} 加入群 {group_id} 的请求。")
-                    await asyncio.sleep(delay_seconds)
-                await self.approve_request(event, flag, False, self.level_reject_reason)
-                logger.info(f"[Authenticator] 已根据等级限制拒绝用户 {user_id} 加入群 {group_id} 的请求。")
-                return
-        
-        # 根据关键词处理，优先检查拒绝关键词
-        for keyword in self.reject_keywords:
-            if self._is_valid_keyword_match(comment, keyword):
-                if delay_seconds > 0:
-                    logger.info(f"[Authenticator] 将在 {delay_seconds} 秒后根据关键词 '{keyword}' 拒绝用户 {user_id} 加入群 {group_id} 的请求。")
-                    await asyncio.sleep(delay_seconds)
-                await self.approve_request(event, flag, False, self.reject_reason)
-                logger.info(f"[Authenticator] 已根据关键词 '{keyword}' 拒绝用户 {user_id} 加入群 {group_id} 的请求。")
-                return
-        
-        # 再检查是否包含接受关键词
-        for keyword in self.accept_keywords:
-            if self._is_valid_keyword_match(comment, keyword):
-                if delay_seconds > 0:
-                    logger.info(f"[Authenticator] 将在 {delay_seconds} 秒后根据关键词 '{keyword}' 同意用户 {user_id} 加入群 {group_id} 的请求。")
-                    await asyncio.sleep(delay_seconds)
-                await self.approve_request(event, flag, True)
-                logger.info(f"[Authenticator] 已根据关键词 '{keyword}' 同意用户 {user_id} 加入群 {group_id} 的请求。")
-                return
-        
-        # 如果没有匹配到关键词，根据AutoReject配置决定是否自动拒绝
-        if self.auto_reject:
-            if delay_seconds > 0:
-                logger.info(f"[Authenticator] 将在 {delay_seconds} 秒后根据AutoReject配置拒绝用户 {user_id} 加入群 {group_id} 的请求。")
-                await asyncio.sleep(delay_seconds)
-            await self.approve_request(event, flag, False, self.reject_reason)
-            logger.info(f"[Authenticator] 已根据AutoReject配置拒绝用户 {user_id} 加入群 {group_id} 的请求。")
-        else:
-            # 不做任何处理，等待手动审核
-            logger.info(f"[Authenticator] 用户 {user_id} 加入群 {group_id} 的请求未匹配到任意关键词，等待手动审核。")
+        decision = await self.evaluate_request(event, request_data, raid_mode)
+        await self.apply_decision(event, request_data, decision)
     
     def _is_valid_keyword_match(self, comment: str, keyword: str) -> bool:
         """
@@ -228,30 +406,27 @@ class AppReview:
         避免数学方程中的数字被误判为答案
         
         Args:
-            comment: 用户输入的验证信息
-            keyword: 要匹配的关键词
+            comment: 规范化后的验证信息
+            keyword: 规范化后的关键词
             
         Returns:
             是否有效匹配
         """
-        comment_lower = comment.lower()
-        keyword_lower = keyword.lower()
-        
         # 如果关键词是数字，需要更严格的匹配
-        if keyword_lower.isdigit() or (keyword_lower.startswith('-') and keyword_lower[1:].isdigit()):
+        if keyword.isdigit() or (keyword.startswith('-') and keyword[1:].isdigit()):
             # 检查是否是数学方程中的数字（在方程中出现）
-            if self._is_number_in_equation(comment_lower, keyword_lower):
+            if self._is_number_in_equation(comment, keyword):
                 return False
             
             # 检查是否是答案格式（如"x=2", "答案：2", "答案是2"等）
-            if self._is_answer_format(comment_lower, keyword_lower):
+            if self._is_answer_format(comment, keyword):
                 return True
                 
             # 对于数字关键词，如果不是在答案格式中，不匹配
             return False
         
         # 对于非数字关键词，使用简单的包含匹配
-        return keyword_lower in comment_lower
+        return keyword in comment
     
     def _is_number_in_equation(self, comment: str, number: str) -> bool:
         """检查数字是否出现在数学方程中"""
@@ -297,14 +472,14 @@ class AppReview:
             f'y={number}', 
             f'z={number}',
             f'={number}',
-            f'答：{number}',
+            f'答:{number}',
             f'答 {number}',
             f'结果{number}',
             f'结果是{number}',
-            f'答案：{number}',
+            f'答案:{number}',
             f'答案 {number}',
             f'结果为{number}',
-            f'结果：{number}'
+            f'结果:{number}'
         ]
         
         # 检查是否匹配任何答案格式
@@ -317,7 +492,7 @@ class AppReview:
         for keyword in answer_keywords:
             # 检查格式如："答案：2"、"答 2"、"x=2"等
             if f'{keyword}{number}' in comment or \
-               f'{keyword}：{number}' in comment or \
+               f'{keyword}:{number}' in comment or \
                f'{keyword} {number}' in comment or \
                f'{keyword}={number}' in comment:
                 return True
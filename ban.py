@@ -3,25 +3,44 @@
 处理黑名单用户的相关功能
 """
 import asyncio
+import heapq
+import threading
 import time
-from typing import Dict, Any, Set, List, Optional
+from typing import Dict, Any, Iterable, Set, List, Optional, Tuple
 
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent, filter
 
+from .function.api_guard import UNAVAILABLE_ERRORS, ApiGuard
+from .function.ban_io import iter_user_ids, write_user_ids
+from .function.metrics import metrics
+from .function.platform_adapter import PlatformRegistry
+
 
 class BanManager:
     """黑名单管理器"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], api_guard: Optional[ApiGuard] = None,
+                 platforms: Optional[PlatformRegistry] = None):
         """
         初始化黑名单管理模块
         
         Args:
             config: 插件配置
+            api_guard: 协议端调用保护器，为空时自行创建
+            platforms: 平台适配器缓存，为空时自行创建
         """
         self.config = config
+        self.api_guard = api_guard or ApiGuard(config)
+        self.platforms = platforms or PlatformRegistry(self.api_guard)
         self.banned_users: Set[str] = set()  # 黑名单用户ID集合
+        # 修改或遍历黑名单集合时持有；批量操作在后台线程中执行，查询无需加锁
+        self._lock = threading.Lock()
+        self._ignore_logged: Set[str] = set()  # 已记录过忽略日志的用户ID
+        # 已安排踢出的成员：(群号, 用户ID)，踢出失败的成员保留在此，直到其重新入群
+        self._kick_scheduled: Set[Tuple[str, str]] = set()
+        self._kick_queue: Optional[asyncio.Queue] = None
+        self._kick_worker: Optional[asyncio.Task] = None
         self._load_config()
         
     def _load_config(self):
@@ -43,6 +62,12 @@ class BanManager:
         self.reject_invitation_enabled = reject_config["RejectInvitationConfig_Enable"]
         self.reject_reason = reject_config["RejectInvitationConfig_Reason"]
         
+        # 发言/入群时踢出黑名单用户配置
+        reconcile_config = ban_config_settings["BanConfig_ReconcileKickConfig"]
+        self.reconcile_kick_enabled = reconcile_config["ReconcileKickConfig_Enable"]
+        self.reconcile_kick_interval = reconcile_config["ReconcileKickConfig_Interval"]
+        self.reconcile_reject_add_request = reconcile_config["ReconcileKickConfig_RejectAddRequest"]
+        
         # 自动踢出配置（已弃用，但保留配置加载以避免错误）
         # auto_kick_config = ban_config_settings["BanConfig_AutoKickConfig"]
         # self.auto_kick_unit = auto_kick_config["AutoKickConfig_Unit"]
@@ -79,7 +104,8 @@ class BanManager:
             是否成功添加
         """
         if user_id not in self.banned_users:
-            self.banned_users.add(user_id)
+            with self._lock:
+                self.banned_users.add(user_id)
             logger.info(f"[Authenticator] 用户 {user_id} 已添加到黑名单")
             return True
         return False
@@ -95,11 +121,169 @@ class BanManager:
             是否成功移除
         """
         if user_id in self.banned_users:
-            self.banned_users.remove(user_id)
+            with self._lock:
+                self.banned_users.discard(user_id)
+            self._ignore_logged.discard(user_id)
             logger.info(f"[Authenticator] 用户 {user_id} 已从黑名单移除")
             return True
         return False
     
+    @staticmethod
+    def _collect_ids(user_ids: Iterable[Any]) -> Tuple[Set[str], int]:
+        """
+        规范化并校验用户ID
+        
+        Args:
+            user_ids: 用户ID（字符串或整数）
+            
+        Returns:
+            Tuple[有效的用户ID集合, 无效条目数]，空白条目不计为无效
+        """
+        ids: Set[str] = set()
+        invalid = 0
+        for user_id in user_ids:
+            user_id = str(user_id).strip()
+            if user_id.isdigit():
+                ids.add(user_id)
+            elif user_id:
+                invalid += 1
+        return ids, invalid
+    
+    def _update_many(self, user_ids: Iterable[Any], add: bool) -> Tuple[int, int, int]:
+        """
+        批量增删黑名单用户（在后台线程中执行）
+        
+        读取与校验用户ID时不持有锁，只在修改集合时短暂持有。
+        
+        Args:
+            user_ids: 用户ID
+            add: True 为添加，False 为移除
+            
+        Returns:
+            Tuple[实际增删的数量, 有效的用户ID数量, 无效条目数]
+        """
+        ids, invalid = self._collect_ids(user_ids)
+        with self._lock:
+            if add:
+                changed = ids - self.banned_users
+                self.banned_users |= changed
+            else:
+                changed = ids & self.banned_users
+                self.banned_users -= changed
+        return len(changed), len(ids), invalid
+    
+    async def add_many(self, user_ids: Iterable[Any], persist: bool = True) -> int:
+        """
+        批量添加用户到黑名单，只记录一条日志并只保存一次配置
+        
+        读取、校验与保存均在后台线程中执行，不阻塞事件循环。
+        
+        Args:
+            user_ids: 用户ID，可以是任意可迭代对象（如逐行读取文件的生成器）
+            persist: 是否将黑名单写回插件配置
+            
+        Returns:
+            新增的用户数量
+        """
+        added, total, invalid = await asyncio.to_thread(self._update_many, user_ids, True)
+        logger.info(f"[Authenticator] 批量添加黑名单: 新增 {added} 个，已存在 {total - added} 个，"
+                    f"无效 {invalid} 个，当前共 {len(self.banned_users)} 个用户")
+        if added and persist:
+            await self._persist()
+        return added
+    
+    async def remove_many(self, user_ids: Iterable[Any], persist: bool = True) -> int:
+        """
+        批量从黑名单中移除用户，只记录一条日志并只保存一次配置
+        
+        读取、校验与保存均在后台线程中执行，不阻塞事件循环。
+        
+        Args:
+            user_ids: 用户ID，可以是任意可迭代对象
+            persist: 是否将黑名单写回插件配置
+            
+        Returns:
+            移除的用户数量
+        """
+        removed, total, invalid = await asyncio.to_thread(self._update_many, user_ids, False)
+        self._ignore_logged = {user_id for user_id in self._ignore_logged if user_id in self.banned_users}
+        logger.info(f"[Authenticator] 批量移除黑名单: 移除 {removed} 个，不在黑名单中 {total - removed} 个，"
+                    f"无效 {invalid} 个，当前共 {len(self.banned_users)} 个用户")
+        if removed and persist:
+            await self._persist()
+        return removed
+    
+    async def import_file(self, path: str, fmt: Optional[str] = None) -> int:
+        """
+        从文件导入黑名单（按行文本、CSV 或 JSON）
+        
+        Args:
+            path: 文件路径
+            fmt: 文件格式（text/csv/json），为空时按扩展名判断
+            
+        Returns:
+            新增的用户数量
+        """
+        return await self.add_many(iter_user_ids(path, fmt))
+    
+    async def remove_file(self, path: str, fmt: Optional[str] = None) -> int:
+        """
+        从黑名单中移除文件中列出的用户
+        
+        Args:
+            path: 文件路径
+            fmt: 文件格式（text/csv/json），为空时按扩展名判断
+            
+        Returns:
+            移除的用户数量
+        """
+        return await self.remove_many(iter_user_ids(path, fmt))
+    
+    async def export_file(self, path: str, fmt: Optional[str] = None) -> int:
+        """
+        在后台线程中将黑名单导出到文件（不排序）
+        
+        在锁内复制一份未排序的列表后逐个写出：写文件耗时较长，不能在此期间持有锁，
+        否则事件循环中的单个添加或移除会被阻塞；直接遍历集合又会因集合被修改而出错。
+        
+        Args:
+            path: 文件路径
+            fmt: 文件格式（text/csv/json），为空时按扩展名判断
+            
+        Returns:
+            导出的用户数量
+        """
+        def export() -> int:
+            with self._lock:
+                user_ids = list(self.banned_users)
+            return write_user_ids(path, user_ids, fmt)
+        
+        count = await asyncio.to_thread(export)
+        logger.info(f"[Authenticator] 已导出 {count} 个黑名单用户到 {path}")
+        return count
+    
+    def _sorted_list(self) -> List[str]:
+        """
+        获取排序后的黑名单列表，用于写回插件配置（在后台线程中调用）
+        
+        分段排序后再合并：一次排序整个黑名单会长时间持有 GIL，使事件循环停顿。
+        """
+        with self._lock:
+            user_ids = list(self.banned_users)
+        chunks = [sorted(user_ids[start:start + 10000]) for start in range(0, len(user_ids), 10000)]
+        return list(heapq.merge(*chunks))
+    
+    async def _persist(self):
+        """将黑名单写回插件配置并保存一次，排序与写盘在后台线程中执行"""
+        self.config["Ban"]["BanConfig"]["BanConfig_List"] = await asyncio.to_thread(self._sorted_list)
+        save_config = getattr(self.config, "save_config", None)
+        if not callable(save_config):
+            return
+        try:
+            await asyncio.to_thread(save_config)
+        except Exception as e:
+            logger.error(f"[Authenticator] 保存黑名单配置失败: {e}")
+    
     def is_banned(self, user_id: str) -> bool:
         """
         检查用户是否在黑名单中
@@ -127,88 +311,100 @@ class BanManager:
             
         user_id = str(event.get_sender_id())
         if self.is_banned(user_id):
-            logger.info(f"[Authenticator] 忽略黑名单用户 {user_id} 的消息")
+            # 同一用户只记录一次，避免仍在群内的黑名单用户每条消息都产生日志
+            if user_id not in self._ignore_logged:
+                self._ignore_logged.add(user_id)
+                logger.info(f"[Authenticator] 忽略黑名单用户 {user_id} 的消息，此后不再逐条记录。")
             return True
             
         return False
     
-    async def process_group_join_request(self, event: AstrMessageEvent, 
-                                       request_data: Dict[str, Any]) -> bool:
+    def reconcile_member(self, event: AstrMessageEvent, raw: Dict[str, Any]) -> None:
         """
-        处理加群请求 - 检查是否在黑名单中
+        黑名单用户在群内发言或入群时，安排一次踢出
+        
+        同一成员只会排队一次，踢出操作由后台任务按固定间隔逐个执行。
         
         Args:
             event: 消息事件
-            request_data: 请求数据
-            
-        Returns:
-            是否处理了该请求（如果在黑名单中并已拒绝返回True）
+            raw: 事件的原始数据
         """
-        if not self.enabled or not self.reject_invitation_enabled:
-            return False
-            
-        user_id = str(request_data.get("user_id", ""))
-        group_id = str(request_data.get("group_id", ""))
-        flag = request_data.get("flag", "")
+        if not self.enabled or not self.reconcile_kick_enabled:
+            return
+        
+        user_id = str(raw.get("user_id", ""))
+        if user_id not in self.banned_users:
+            return
         
-        # 检查白名单，如果配置了白名单且当前群不在白名单中，则跳过处理
+        post_type = raw.get("post_type")
+        is_join = post_type == "notice" and raw.get("notice_type") == "group_increase"
+        if not is_join and not (post_type == "message" and raw.get("message_type") == "group"):
+            return
+        
+        group_id = str(raw.get("group_id", ""))
         if self.whitelist_groups and group_id not in self.whitelist_groups:
-            logger.debug(f"[Authenticator] 群 {group_id} 不在白名单内，跳过黑名单检查。")
-            return False
+            return
         
-        if self.is_banned(user_id):
-            logger.info(f"[Authenticator] 拒绝黑名单用户 {user_id} 加入群 {group_id} 的请求")
-            
-            # 调用拒绝加群请求的方法
-            success = await self._reject_group_join_request(event, flag, self.reject_reason)
-            if success:
-                logger.info(f"[Authenticator] 已成功拒绝黑名单用户 {user_id} 的加群请求")
+        adapter = self.platforms.for_event(event)
+        if adapter is None:
+            return
+        
+        key = (group_id, user_id)
+        if is_join:
+            # 重新入群后允许再次踢出（包括之前踢出失败的情况）
+            self._kick_scheduled.discard(key)
+        if key in self._kick_scheduled:
+            return
+        self._kick_scheduled.add(key)
+        
+        if self._kick_queue is None:
+            self._kick_queue = asyncio.Queue()
+        self._kick_queue.put_nowait((adapter, group_id, user_id))
+        metrics.incr("ban.reconcile.scheduled")
+        metrics.set_gauge("ban.reconcile.queue", self._kick_queue.qsize())
+        logger.info(f"[Authenticator] 黑名单用户 {user_id} 仍在群 {group_id} 中，已安排踢出。")
+        
+        if self._kick_worker is None or self._kick_worker.done():
+            self._kick_worker = asyncio.create_task(self._run_kick_queue())
+    
+    async def _run_kick_queue(self):
+        """按配置的间隔逐个执行踢出，队列清空后退出"""
+        queue = self._kick_queue
+        while queue is not None and not queue.empty():
+            adapter, group_id, user_id = queue.get_nowait()
+            metrics.set_gauge("ban.reconcile.queue", queue.qsize())
+            try:
+                await adapter.set_group_kick(
+                    int(group_id), int(user_id),
+                    reject_add_request=self.reconcile_reject_add_request
+                )
+            except UNAVAILABLE_ERRORS as e:
+                # 协议端暂不可用，下次发言或入群时重新安排
+                self._kick_scheduled.discard((group_id, user_id))
+                metrics.incr("ban.reconcile.failed")
+                logger.warning(f"[Authenticator] 协议端暂不可用，踢出黑名单用户 {user_id} 失败: {type(e).__name__} {e}")
+            except Exception as e:
+                metrics.incr("ban.reconcile.failed")
+                logger.error(f"[Authenticator] 从群 {group_id} 踢出黑名单用户 {user_id} 失败: {e}")
             else:
-                logger.error(f"[Authenticator] 拒绝黑名单用户 {user_id} 的加群请求失败")
-                
-            return True
-            
-        return False
+                self._kick_scheduled.discard((group_id, user_id))
+                metrics.incr("ban.reconcile.kicked")
+                logger.info(f"[Authenticator] 已将黑名单用户 {user_id} 从群 {group_id} 踢出。")
+            await asyncio.sleep(self.reconcile_kick_interval)
     
-    async def _reject_group_join_request(self, event: AstrMessageEvent, 
-                                        flag: str, reason: str) -> bool:
+    def should_reject_join_request(self, user_id: str) -> bool:
         """
-        拒绝加群请求
+        检查是否应拒绝该用户的加群请求
         
         Args:
-            event: 消息事件
-            flag: 请求标识
-            reason: 拒绝理由
+            user_id: 用户ID
             
         Returns:
-            操作是否成功
+            黑名单拒绝加群功能已启用且用户在黑名单中时返回True
         """
-        # 检查是否为aiocqhttp平台
-        if event.get_platform_name() != "aiocqhttp":
-            logger.debug(f"[Authenticator] 插件仅支持 aiocqhttp 平台处理群聊申请，当前平台: {event.get_platform_name()}，跳过操作。")
-            return False
-            
-        try:
-            # 使用NapCat API格式
-            from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import AiocqhttpMessageEvent
-            assert isinstance(event, AiocqhttpMessageEvent)
-            client = event.bot
-            
-            # 调用NapCat API
-            payloads = {
-                "flag": flag,
-                "sub_type": "add",
-                "approve": False,
-                "reason": reason if reason else ""
-            }
-            
-            await client.call_action('set_group_add_request', **payloads)
-            return True
-        except Exception as e:
-            logger.error(f"[Authenticator] 拒绝群聊申请失败: {e}")
+        if not self.enabled or not self.reject_invitation_enabled:
             return False
-    
-
+        return self.is_banned(str(user_id))
     
     def stop_auto_kick_task(self):
         """停止自动踢出任务（空实现，保持接口兼容性）"""
@@ -217,5 +413,12 @@ class BanManager:
     def cleanup(self):
         """清理资源"""
         self.stop_auto_kick_task()
-        self.banned_users.clear()
+        if self._kick_worker and not self._kick_worker.done():
+            self._kick_worker.cancel()
+        self._kick_worker = None
+        self._kick_queue = None
+        self._kick_scheduled.clear()
+        self._ignore_logged.clear()
+        with self._lock:
+            self.banned_users.clear()
         logger.debug("[Authenticator] 黑名单资源已清理")
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+黑名单批量导入压测
+生成一个大型黑名单文件，对比逐个添加与批量导入的耗时和日志量，并统计批量导入、移除与导出期间
+事件循环的最长停顿时间，检查导入导出的结果。
+
+用法（在 AstrBot 根目录下执行）：
+    python data/plugins/<插件目录>/benchmarks/ban_import.py --count 200000
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PLUGIN_DIR, "function"))
+
+from replay import PLUGIN_PACKAGE, default_config, load_plugin  # noqa: E402
+
+
+class SavingConfig(dict):
+    """带 save_config 的插件配置，与 AstrBot 的配置对象一样写入 JSON 文件"""
+    
+    def __init__(self, config: Dict[str, Any], path: str) -> None:
+        super().__init__(config)
+        self.path = path
+    
+    def save_config(self) -> None:
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(self, file, ensure_ascii=False, indent=2)
+
+
+class LineCounter(logging.Handler):
+    """统计插件输出的日志行数"""
+    
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+
+async def measure(operation: Callable[[], Awaitable[Any]]) -> Tuple[Any, float, float]:
+    """
+    执行操作，同时以 5 毫秒为间隔检查事件循环是否被阻塞
+    
+    Returns:
+        Tuple[操作结果, 耗时（秒）, 事件循环最长停顿（秒）]
+    """
+    stall = 0.0
+    done = False
+    
+    async def ticker():
+        nonlocal stall
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            stall = max(stall, now - last - 0.005)
+            last = now
+    
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    result = await operation()
+    elapsed = time.perf_counter() - start
+    done = True
+    await task
+    return result, elapsed, stall
+
+
+async def run(ban_module, count: int, directory: str, max_stall: float) -> List[str]:
+    """执行各项测试，返回未通过的检查项"""
+    source = os.path.join(directory, "ban.txt")
+    with open(source, "w", encoding="utf-8") as file:
+        for index in range(count):
+            file.write(f"{100000000 + index}\n")
+        file.write("not-an-id\n\n")
+    
+    counter = LineCounter()
+    logging.getLogger("astrbot").addHandler(counter)
+    failures = []
+    
+    def new_manager():
+        config = SavingConfig(default_config(), os.path.join(directory, "config.json"))
+        config["Ban"]["Ban_Enable"] = True
+        return ban_module.BanManager(config)
+    
+    # 逐个添加（原有方式），事件循环在整个过程中被阻塞
+    manager = new_manager()
+    counter.count = 0
+    start = time.perf_counter()
+    with open(source, encoding="utf-8") as file:
+        for line in file:
+            if line.strip().isdigit():
+                manager.add_to_ban_list(line.strip())
+    single_elapsed, single_lines = time.perf_counter() - start, counter.count
+    print(f"逐个添加: {count} 个用户，耗时 {single_elapsed:.3f}s，日志 {single_lines} 行，期间事件循环完全阻塞")
+    
+    # 批量导入、导出与移除
+    manager = new_manager()
+    counter.count = 0
+    added, elapsed, stall = await measure(lambda: manager.import_file(source))
+    print(f"批量导入: 新增 {added} 个用户，耗时 {elapsed:.3f}s，日志 {counter.count} 行，事件循环最长停顿 {stall * 1000:.1f}ms")
+    if added != count:
+        failures.append(f"导入数量 {added} 与文件中的有效ID数 {count} 不同")
+    if counter.count > 2:
+        failures.append(f"批量导入输出了 {counter.count} 行日志")
+    if stall > max_stall:
+        failures.append(f"批量导入期间事件循环停顿 {stall * 1000:.1f}ms")
+    with open(manager.config.path, encoding="utf-8") as file:
+        saved = json.load(file)["Ban"]["BanConfig"]["BanConfig_List"]
+    if len(saved) != count:
+        failures.append(f"保存到配置的黑名单数量 {len(saved)} 与导入数量不同")
+    
+    for fmt in ("json", "csv"):
+        target = os.path.join(directory, f"export.{fmt}")
+        exported, elapsed, stall = await measure(lambda: manager.export_file(target))
+        print(f"导出 {fmt}: {exported} 个用户，耗时 {elapsed:.3f}s，事件循环最长停顿 {stall * 1000:.1f}ms")
+        check = new_manager()
+        await check.import_file(target)
+        if check.banned_users != manager.banned_users:
+            failures.append(f"{fmt} 导出后重新导入的黑名单与原黑名单不同")
+        if stall > max_stall:
+            failures.append(f"导出 {fmt} 期间事件循环停顿 {stall * 1000:.1f}ms")
+    
+    removed, elapsed, stall = await measure(lambda: manager.remove_file(source))
+    print(f"批量移除: 移除 {removed} 个用户，耗时 {elapsed:.3f}s，事件循环最长停顿 {stall * 1000:.1f}ms")
+    if removed != count or manager.banned_users:
+        failures.append(f"批量移除后仍有 {len(manager.banned_users)} 个用户")
+    if stall > max_stall:
+        failures.append(f"批量移除期间事件循环停顿 {stall * 1000:.1f}ms")
+    
+    logging.getLogger("astrbot").removeHandler(counter)
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="黑名单批量导入压测")
+    parser.add_argument("--count", type=int, default=200000, help="黑名单文件中的用户数量")
+    parser.add_argument("--max-stall", type=float, default=100.0, help="允许的事件循环最长停顿（毫秒）")
+    parser.add_argument("--astrbot-root", default=os.getcwd(), help="AstrBot 根目录，默认为当前目录")
+    args = parser.parse_args(argv)
+    
+    sys.path.insert(0, args.astrbot_root)
+    load_plugin()
+    ban_module = importlib.import_module(f"{PLUGIN_PACKAGE}.ban")
+    logging.getLogger("astrbot").setLevel(logging.INFO)
+    logging.getLogger("astrbot").propagate = False
+    
+    with tempfile.TemporaryDirectory() as directory:
+        failures = asyncio.run(run(ban_module, args.count, directory, args.max_stall / 1000))
+    for failure in failures:
+        print(f"未通过: {failure}")
+    print("全部检查通过。" if not failures else f"{len(failures)} 项检查未通过。")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+批量审核压测
+模拟短时间内涌入的大量加群请求，分别用批量审核与逐条审核处理，检查两者的审核结果一致，
+并统计协议端调用次数与并发峰值。使用 function/replay.py 的虚拟时间，无需真实等待。
+
+用法（在 AstrBot 根目录下执行）：
+    python data/plugins/<插件目录>/benchmarks/review_burst.py --requests 1000
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PLUGIN_DIR, "function"))
+
+from replay import ReplayBot, VirtualClock, default_config, load_plugin, make_event_factory, virtual_time  # noqa: E402
+
+
+class BurstBot(ReplayBot):
+    """按用户返回不同等级，并记录每个接口的并发峰值的协议端替身"""
+    
+    def __init__(self, clock_start: float, latency: float) -> None:
+        super().__init__(clock_start, latency)
+        self.inflight: Counter = Counter()
+        self.peak: Counter = Counter()
+    
+    async def call_action(self, action: str, **params: Any) -> Dict[str, Any]:
+        self.inflight[action] += 1
+        self.peak[action] = max(self.peak[action], self.inflight[action])
+        try:
+            result = await super().call_action(action, **params)
+        finally:
+            self.inflight[action] -= 1
+        if action == "get_stranger_info":
+            result["qqLevel"] = int(params["user_id"]) % 20
+        return result
+
+
+def make_config(batch: bool, delay_seconds: int = 0, action_workers: int = 4) -> Dict[str, Any]:
+    """压测使用的插件配置：关键词、等级限制与黑名单均启用"""
+    config = default_config()
+    config["EventCapture"]["EventCapture_Enable"] = False
+    
+    review = config["AutomaticReview"]
+    review["AutomaticReview_Enable"] = True
+    review["AutomaticReview_KeywordsConfig"]["KeywordsConfig_AcceptKeywords"] = ["入群"]
+    review["AutomaticReview_KeywordsConfig"]["KeywordsConfig_RejectConfig"]["RejectConfig_RejectKeywords"] = ["广告"]
+    review["AutomaticReview_LevelRestrictionsConfig"]["LevelRestrictionsConfig_Number"] = 5
+    review["AutomaticReview_DelaySeconds"] = delay_seconds
+    batch_config = review["AutomaticReview_BatchConfig"]
+    batch_config["BatchConfig_Enable"] = batch
+    batch_config["BatchConfig_ActionWorkers"] = action_workers
+    
+    ban = config["Ban"]
+    ban["Ban_Enable"] = True
+    ban["BanConfig"]["BanConfig_List"] = [str(user_id) for user_id in range(10000, 10100, 7)]
+    ban["BanConfig"]["BanConfig_RejectInvitationConfig"]["RejectInvitationConfig_Enable"] = True
+    return config
+
+
+def make_requests(count: int, seconds: float, seed: int) -> List[Dict[str, Any]]:
+    """
+    生成在 seconds 秒内到达的 count 个加群请求
+    
+    部分用户同时申请多个群；同一用户对同一群只申请一次，批量审核的窗口内去重不影响对比。
+    """
+    rng = random.Random(seed)
+    comments = ["我想入群", "广告代发", "你好", "入群学习", ""]
+    requests = []
+    seen = set()
+    for index in range(count):
+        group_id = 1000 + index % 5
+        user_id = 10000 + rng.randrange(count * 3 // 4)
+        while (group_id, user_id) in seen:
+            user_id = 10000 + rng.randrange(count * 3 // 4)
+        seen.add((group_id, user_id))
+        requests.append({
+            "time": seconds * index / count,
+            "raw": {
+                "post_type": "request",
+                "request_type": "group",
+                "sub_type": "add",
+                "group_id": group_id,
+                "user_id": user_id,
+                "comment": rng.choice(comments),
+                "flag": f"flag-{index}",
+                "time": index,
+            },
+        })
+    return requests
+
+
+async def run(plugin_main, config: Dict[str, Any], requests: List[Dict[str, Any]],
+              latency: float) -> Dict[str, Any]:
+    """
+    将请求按到达时间送入插件，等待所有审核操作完成
+    
+    Returns:
+        {"decisions": 请求标识 -> (是否同意, 理由), "times": 请求标识 -> 执行时间, "bot": 协议端替身}
+    """
+    ReplayEvent = make_event_factory()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    bot = BurstBot(start, latency)
+    plugin = plugin_main.AuthenticatorPlugin(None, config)
+    
+    tasks = []
+    for request in requests:
+        wait = start + request["time"] - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        tasks.append(asyncio.create_task(plugin.handle_event(ReplayEvent(request, bot))))
+    await asyncio.gather(*tasks)
+    await plugin.review_queue.drain()
+    await plugin.terminate()
+    
+    decisions, times = {}, {}
+    for action in bot.actions:
+        if action["action"] == "set_group_add_request":
+            params = action["params"]
+            decisions[params["flag"]] = (params["approve"], params["reason"])
+            times[params["flag"]] = action["time"]
+    return {"decisions": decisions, "times": times, "bot": bot}
+
+
+def check_burst(plugin_main, count: int, latency: float, seed: int) -> List[str]:
+    """批量审核与逐条审核的结果对比，返回未通过的检查项"""
+    requests = make_requests(count, 2.0, seed)
+    results = {}
+    for batch in (False, True):
+        with virtual_time(VirtualClock()) as loop:
+            results[batch] = loop.run_until_complete(run(plugin_main, make_config(batch), requests, latency))
+    
+    config = make_config(True)["AutomaticReview"]["AutomaticReview_BatchConfig"]
+    unique_users = len({request["raw"]["user_id"] for request in requests})
+    print(f"请求数: {count}，不同用户: {unique_users}")
+    for batch, label in ((False, "逐条审核"), (True, "批量审核")):
+        bot = results[batch]["bot"]
+        calls = Counter(action["action"] for action in bot.actions)
+        print(f"{label}: 等级查询 {calls['get_stranger_info']} 次（并发峰值 {bot.peak['get_stranger_info']}），"
+              f"审核操作 {calls['set_group_add_request']} 次（并发峰值 {bot.peak['set_group_add_request']}）")
+    
+    failures = []
+    unbatched, batched = results[False], results[True]
+    if batched["decisions"] != unbatched["decisions"]:
+        differing = [flag for flag in unbatched["decisions"] if batched["decisions"].get(flag) != unbatched["decisions"][flag]]
+        failures.append(f"批量审核与逐条审核的结果不一致: {len(differing)} 个请求，如 {differing[:5]}")
+    calls = Counter(action["action"] for action in batched["bot"].actions)
+    unbatched_calls = Counter(action["action"] for action in unbatched["bot"].actions)
+    if calls["get_stranger_info"] >= unbatched_calls["get_stranger_info"]:
+        failures.append(f"等级查询次数 {calls['get_stranger_info']} 未少于逐条审核的 {unbatched_calls['get_stranger_info']}")
+    if calls["set_group_add_request"] != unbatched_calls["set_group_add_request"]:
+        failures.append(f"审核操作次数 {calls['set_group_add_request']} 与逐条审核的 {unbatched_calls['set_group_add_request']} 不同")
+    if batched["bot"].peak["get_stranger_info"] > config["BatchConfig_LookupConcurrency"]:
+        failures.append(f"等级查询并发峰值 {batched['bot'].peak['get_stranger_info']} 超过上限")
+    if batched["bot"].peak["set_group_add_request"] > config["BatchConfig_ActionWorkers"]:
+        failures.append(f"审核操作并发峰值 {batched['bot'].peak['set_group_add_request']} 超过上限")
+    return failures
+
+
+def check_immediate_reject(plugin_main, latency: float) -> List[str]:
+    """延迟处理开启时，黑名单拒绝不应排在尚未到期的延迟操作之后"""
+    requests = make_requests(20, 0.1, 0)
+    for request in requests:
+        request["raw"]["user_id"] = 20000 + request["raw"]["time"]
+        request["raw"]["comment"] = "入群"
+    requests[-1]["raw"]["user_id"] = 10000  # 黑名单用户
+    
+    with virtual_time(VirtualClock()) as loop:
+        result = loop.run_until_complete(
+            run(plugin_main, make_config(True, delay_seconds=60, action_workers=1), requests, latency)
+        )
+    
+    banned_at = result["times"].get(requests[-1]["raw"]["flag"])
+    print(f"延迟 60 秒、1 个工作协程时，黑名单拒绝执行于 t={banned_at}s")
+    if banned_at is None or banned_at >= 60:
+        return [f"黑名单拒绝未立即执行（t={banned_at}s）"]
+    return []
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量审核压测")
+    parser.add_argument("--requests", type=int, default=1000, help="模拟的加群请求数量")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟每次协议端调用的耗时（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--astrbot-root", default=os.getcwd(), help="AstrBot 根目录，默认为当前目录")
+    args = parser.parse_args(argv)
+    
+    sys.path.insert(0, args.astrbot_root)
+    plugin_main = load_plugin()
+    logging.getLogger("astrbot").setLevel(logging.WARNING)
+    
+    failures = check_burst(plugin_main, args.requests, args.latency, args.seed)
+    failures += check_immediate_reject(plugin_main, args.latency)
+    for failure in failures:
+        print(f"未通过: {failure}")
+    print("全部检查通过。" if not failures else f"{len(failures)} 项检查未通过。")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
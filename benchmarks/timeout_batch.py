@@ -0,0 +1,159 @@
+"""
+验证超时合并处理压测
+模拟突袭后大量新成员在短时间内入群且均未完成验证，分别用逐个处理与合并处理清理超时成员，
+对比发送的群消息数量与清理完毕所需的时间，并检查所有超时成员都被踢出。
+协议端按 NapCat 的方式建模：所有调用共享有限的工作线程，群消息发送受频率限制。
+使用 function/replay.py 的虚拟时间，无需真实等待。
+
+用法（在 AstrBot 根目录下执行）：
+    python data/plugins/<插件目录>/benchmarks/timeout_batch.py --members 500
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PLUGIN_DIR, "function"))
+
+from replay import ReplayBot, VirtualClock, default_config, load_plugin, make_event_factory, virtual_time  # noqa: E402
+
+
+class NapCatBot(ReplayBot):
+    """所有调用共享有限工作线程、群消息发送受频率限制的协议端替身"""
+    
+    def __init__(self, clock_start: float, latency: float, workers: int, message_interval: float) -> None:
+        super().__init__(clock_start, latency)
+        self.workers = asyncio.Semaphore(workers)
+        self.message_lock = asyncio.Lock()
+        self.message_interval = message_interval
+    
+    async def call_action(self, action: str, **params: Any) -> Dict[str, Any]:
+        if action == "send_group_msg":
+            async with self.message_lock:
+                await asyncio.sleep(self.message_interval)
+        async with self.workers:
+            return await super().call_action(action, **params)
+
+
+def make_config(batch: bool, timeout: int) -> Dict[str, Any]:
+    """压测使用的插件配置：超时提示与踢出提示均启用，协议端调用不超时、不熔断"""
+    config = default_config()
+    config["EventCapture"]["EventCapture_Enable"] = False
+    
+    recaptcha = config["SimpleReCAPTCHA"]
+    recaptcha["SimpleReCAPTCHA_VerificationTimeout"] = timeout
+    recaptcha["SimpleReCAPTCHA_TimeoutBatchConfig"]["TimeoutBatchConfig_Enable"] = batch
+    message_config = recaptcha["SimpleReCAPTCHA_MessageConfig"]
+    message_config["MessageConfig_FailureConfig"]["FailureConfig_Enable"] = True
+    message_config["MessageConfig_KickConfig"]["KickConfig_Enable"] = True
+    message_config["MessageConfig_CountdownWarningConfig"]["CountdownWarningConfig_Time"] = 0
+    
+    # 入群验证消息按突袭模式合并发送，两种处理方式下相同
+    config["RaidDetection"]["RaidDetection_Enable"] = True
+    
+    guard = config["ApiGuard"]
+    guard["ApiGuard_TimeoutConfig"]["TimeoutConfig_Lookup"] = 10 ** 6
+    guard["ApiGuard_TimeoutConfig"]["TimeoutConfig_Action"] = 10 ** 6
+    guard["ApiGuard_BreakerConfig"]["BreakerConfig_SlowCallSeconds"] = 10 ** 6
+    return config
+
+
+def make_joins(count: int, seconds: float, group_id: int) -> List[Dict[str, Any]]:
+    """生成在 seconds 秒内入群的 count 个新成员"""
+    return [{
+        "time": seconds * index / count,
+        "raw": {
+            "post_type": "notice",
+            "notice_type": "group_increase",
+            "sub_type": "approve",
+            "group_id": group_id,
+            "user_id": 10000 + index,
+            "time": index,
+        },
+    } for index in range(count)]
+
+
+async def run(plugin_main, config: Dict[str, Any], joins: List[Dict[str, Any]], args) -> Dict[str, Any]:
+    """
+    将入群通知按时间送入插件，等待所有待验证成员被清理
+    
+    Returns:
+        {"actions": 第一个成员超时之后的协议端调用, "cleared": 从第一个成员超时到最后一次调用的时间,
+         "pending": 结束时仍在等待验证的成员数}
+    """
+    ReplayEvent = make_event_factory()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    bot = NapCatBot(start, args.latency, args.workers, args.message_interval)
+    plugin = plugin_main.AuthenticatorPlugin(None, config)
+    
+    for join in joins:
+        wait = start + join["time"] - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        await plugin.handle_event(ReplayEvent(join, bot))
+    
+    deadline = start + args.timeout + args.settle
+    while plugin.recaptcha.pending and loop.time() < deadline:
+        await asyncio.sleep(1)
+    pending = len(plugin.recaptcha.pending)
+    await plugin.terminate()
+    
+    first_expiry = args.timeout
+    actions = [action for action in bot.actions if action["time"] >= first_expiry]
+    cleared = max((action["time"] for action in actions), default=first_expiry) + args.latency - first_expiry
+    return {"actions": actions, "cleared": cleared, "pending": pending}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="验证超时合并处理压测")
+    parser.add_argument("--members", type=int, default=500, help="同时入群且未完成验证的成员数量")
+    parser.add_argument("--join-seconds", type=float, default=5.0, help="成员入群的时间跨度（秒）")
+    parser.add_argument("--timeout", type=int, default=60, help="验证超时时间（秒）")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟每次协议端调用的耗时（秒）")
+    parser.add_argument("--workers", type=int, default=4, help="模拟协议端的工作线程数量")
+    parser.add_argument("--message-interval", type=float, default=0.3, help="模拟群消息的最小发送间隔（秒）")
+    parser.add_argument("--settle", type=float, default=3600.0, help="等待清理完毕的最长时间（秒）")
+    parser.add_argument("--astrbot-root", default=os.getcwd(), help="AstrBot 根目录，默认为当前目录")
+    args = parser.parse_args(argv)
+    
+    sys.path.insert(0, args.astrbot_root)
+    plugin_main = load_plugin()
+    logging.getLogger("astrbot").setLevel(logging.WARNING)
+    
+    joins = make_joins(args.members, args.join_seconds, 1000)
+    results = {}
+    for batch in (False, True):
+        with virtual_time(VirtualClock()) as loop:
+            results[batch] = loop.run_until_complete(run(plugin_main, make_config(batch, args.timeout), joins, args))
+    
+    print(f"成员数: {args.members}，{args.join_seconds:g} 秒内入群，验证超时 {args.timeout} 秒")
+    calls = {}
+    for batch, label in ((False, "逐个处理"), (True, "合并处理")):
+        result = results[batch]
+        calls[batch] = Counter(action["action"] for action in result["actions"])
+        print(f"{label}: 群消息 {calls[batch]['send_group_msg']} 条，踢出 {calls[batch]['set_group_kick']} 次，"
+              f"从首个成员超时到清理完毕 {result['cleared']:.1f}s")
+    
+    failures = []
+    for batch, label in ((False, "逐个处理"), (True, "合并处理")):
+        if results[batch]["pending"]:
+            failures.append(f"{label}结束时仍有 {results[batch]['pending']} 名成员等待验证")
+        if calls[batch]["set_group_kick"] != args.members:
+            failures.append(f"{label}踢出 {calls[batch]['set_group_kick']} 次，应为 {args.members} 次")
+    if calls[True]["send_group_msg"] >= calls[False]["send_group_msg"]:
+        failures.append(f"合并处理的群消息 {calls[True]['send_group_msg']} 条未少于逐个处理的 {calls[False]['send_group_msg']} 条")
+    if results[True]["cleared"] >= results[False]["cleared"]:
+        failures.append(f"合并处理的清理时间 {results[True]['cleared']:.1f}s 未短于逐个处理的 {results[False]['cleared']:.1f}s")
+    for failure in failures:
+        print(f"未通过: {failure}")
+    print("全部检查通过。" if not failures else f"{len(failures)} 项检查未通过。")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+准入控制模块
+统计各模块正在处理的事件数量，超过上限时优先丢弃低价值的事件
+"""
+from typing import Any, Dict
+
+from .dedup_cache import DedupCache
+from .metrics import metrics
+
+
+class AdmissionController:
+    """事件处理准入控制器"""
+    
+    # 事件优先级：关键事件（加群申请、成员变动等）始终放行
+    CRITICAL = 0
+    NORMAL = 1
+    LOW = 2
+    
+    def __init__(self, config: Dict[str, Any]) -> None:
+        """
+        初始化准入控制器
+        
+        Args:
+            config: 插件配置
+        """
+        self._load_config(config)
+        self._inflight: Dict[str, int] = {}
+        # 记录待验证用户最近一次被处理的回答，用于识别短时间内的重复回答
+        self._recent_answers = DedupCache(4096, self.answer_debounce_seconds)
+    
+    def _load_config(self, config: Dict[str, Any]) -> None:
+        """加载准入控制相关配置"""
+        admission_config = config["AdmissionControl"]
+        
+        self.enabled = admission_config["AdmissionControl_Enable"]
+        self.soft_limit = max(1, admission_config["AdmissionControl_SoftLimit"])
+        self.hard_limit = max(self.soft_limit, admission_config["AdmissionControl_HardLimit"])
+        self.answer_debounce_seconds = admission_config["AdmissionControl_AnswerDebounceMs"] / 1000
+    
+    def inflight(self, module: str) -> int:
+        """获取模块当前正在处理的事件数量"""
+        return self._inflight.get(module, 0)
+    
+    def try_acquire(self, module: str, priority: int, reason: str = "") -> bool:
+        """
+        尝试为事件申请处理名额
+        
+        超过软上限时丢弃低优先级事件，超过硬上限时只放行关键事件。
+        
+        Args:
+            module: 处理该事件的模块
+            priority: 事件优先级
+            reason: 事件类别，用于统计丢弃数量
+        
+        Returns:
+            是否放行，放行后须调用 release 归还名额
+        """
+        inflight = self._inflight.get(module, 0)
+        if self.enabled and priority != self.CRITICAL:
+            limit = self.soft_limit if priority == self.LOW else self.hard_limit
+            if inflight >= limit:
+                metrics.incr(f"admission.shed.{module}.{reason or 'event'}")
+                return False
+        
+        self._inflight[module] = inflight + 1
+        metrics.set_gauge(f"admission.inflight.{module}", inflight + 1)
+        return True
+    
+    def release(self, module: str) -> None:
+        """
+        归还处理名额
+        
+        Args:
+            module: 处理该事件的模块
+        """
+        inflight = max(0, self._inflight.get(module, 0) - 1)
+        self._inflight[module] = inflight
+        metrics.set_gauge(f"admission.inflight.{module}", inflight)
+    
+    def answer_priority(self, user_id: str) -> int:
+        """
+        获取待验证用户回答的优先级
+        
+        在防抖时间内重复回答的消息视为低优先级，其余回答为普通优先级。
+        
+        Args:
+            user_id: 用户ID
+        """
+        if self._recent_answers.seen(user_id):
+            return self.LOW
+        return self.NORMAL
+    
+    def cleanup(self) -> None:
+        """清理资源"""
+        self._inflight.clear()
+        self._recent_answers.clear()
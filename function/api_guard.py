@@ -0,0 +1,142 @@
+"""
+协议端调用保护模块
+为每次调用设置超时时间，并为每个协议端连接维护独立的熔断器
+"""
+import asyncio
+import time
+from typing import Any, Dict, Tuple, Type
+
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .metrics import metrics
+
+# 查询类接口，超时后可以降级处理
+LOOKUP_ACTIONS = ("get_stranger_info", "get_group_member_info")
+
+# 计入熔断的连接错误：网络错误，以及协议端未连接或 HTTP 请求失败。
+# 协议端正常返回的错误（如 ActionFailed：无权限、请求已处理）说明连接正常，不计入熔断
+try:
+    from aiocqhttp.exceptions import ApiNotAvailable, HttpFailed
+    CONNECTION_ERRORS: Tuple[Type[BaseException], ...] = (OSError, ApiNotAvailable, HttpFailed)
+except ImportError:
+    CONNECTION_ERRORS = (OSError,)
+
+# 视为协议端暂不可用的错误：熔断器拒绝调用、调用超时与连接错误，调用方据此统一降级处理
+UNAVAILABLE_ERRORS: Tuple[Type[BaseException], ...] = (CircuitOpenError, asyncio.TimeoutError) + CONNECTION_ERRORS
+
+
+class ApiGuard:
+    """协议端调用保护器"""
+    
+    def __init__(self, config: Dict[str, Any]) -> None:
+        """
+        初始化协议端调用保护器
+        
+        Args:
+            config: 插件配置
+        """
+        self._load_config(config)
+        self._breakers: Dict[int, CircuitBreaker] = {}
+    
+    def _load_config(self, config: Dict[str, Any]) -> None:
+        """加载调用保护相关配置"""
+        guard_config = config["ApiGuard"]
+        
+        timeout_config = guard_config["ApiGuard_TimeoutConfig"]
+        self.lookup_timeout = timeout_config["TimeoutConfig_Lookup"]
+        self.action_timeout = timeout_config["TimeoutConfig_Action"]
+        
+        breaker_config = guard_config["ApiGuard_BreakerConfig"]
+        self.failure_threshold = breaker_config["BreakerConfig_FailureThreshold"]
+        self.slow_call_seconds = breaker_config["BreakerConfig_SlowCallSeconds"]
+        self.reset_seconds = breaker_config["BreakerConfig_ResetSeconds"]
+    
+    def breaker(self, client: Any) -> CircuitBreaker:
+        """
+        获取（或创建）协议端连接对应的熔断器
+        
+        Args:
+            client: 协议端客户端
+        """
+        breaker = self._breakers.get(id(client))
+        if breaker is None:
+            breaker = self._breakers[id(client)] = CircuitBreaker(
+                self.failure_threshold, self.slow_call_seconds, self.reset_seconds
+            )
+        return breaker
+    
+    def is_available(self, client: Any) -> bool:
+        """检查协议端连接当前是否可用（熔断器未打开）"""
+        return self.breaker(client).is_available()
+    
+    def timeout_for(self, action: str) -> float:
+        """获取接口的超时时间（秒）"""
+        return self.lookup_timeout if action in LOOKUP_ACTIONS else self.action_timeout
+    
+    async def call(self, client: Any, action: str, **params: Any) -> Any:
+        """
+        在超时时间与熔断器保护下调用协议端接口
+        
+        Args:
+            client: 协议端客户端
+            action: 接口名称
+            **params: 接口参数
+            
+        Returns:
+            接口返回值
+            
+        只有超时、慢调用与连接错误计入熔断，协议端返回的其他错误原样抛出。
+        
+        Raises:
+            CircuitOpenError: 熔断器已打开，调用被直接拒绝
+            asyncio.TimeoutError: 调用超时
+            CONNECTION_ERRORS: 连接错误（以上三类均包含在 UNAVAILABLE_ERRORS 中）
+        """
+        breaker = self.breaker(client)
+        if not breaker.allow():
+            metrics.incr(f"napcat.rejected.{action}")
+            raise CircuitOpenError(f"协议端熔断中，已跳过 {action} 调用")
+        
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                client.api.call_action(action, **params),
+                timeout=self.timeout_for(action)
+            )
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+        except asyncio.TimeoutError:
+            metrics.incr(f"napcat.timeout.{action}")
+            breaker.record_failure()
+            self._update_gauges()
+            raise
+        except CONNECTION_ERRORS:
+            breaker.record_failure()
+            self._update_gauges()
+            raise
+        except Exception:
+            # 协议端拒绝了本次请求，与连接状态无关
+            metrics.incr(f"napcat.failed.{action}")
+            breaker.release_probe()
+            raise
+        
+        duration = time.perf_counter() - start
+        metrics.observe(f"napcat.call.{action}", duration)
+        breaker.record_success(duration)
+        self._update_gauges()
+        return result
+    
+    def _update_gauges(self) -> None:
+        """更新熔断器相关的状态指标"""
+        now = time.monotonic()
+        open_breakers = [b for b in self._breakers.values() if b.state != CircuitBreaker.CLOSED]
+        metrics.set_gauge("napcat.breaker.open_clients", len(open_breakers))
+        metrics.set_gauge("napcat.breaker.open_seconds", max((b.open_seconds(now) for b in open_breakers), default=0.0))
+    
+    def refresh(self) -> None:
+        """刷新熔断器状态指标（用于查看指标前）"""
+        self._update_gauges()
+    
+    def cleanup(self) -> None:
+        """清理资源"""
+        self._breakers.clear()
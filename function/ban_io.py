@@ -0,0 +1,96 @@
+"""
+黑名单导入导出模块
+以流式方式读取或写出用户ID列表，支持按行文本、CSV 与 JSON 三种格式
+"""
+import csv
+import json
+import os
+from typing import Iterable, Iterator, Optional
+
+FORMATS = ("text", "csv", "json")
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    确定文件格式
+    
+    Args:
+        path: 文件路径
+        fmt: 指定的格式，为空时按扩展名判断，未知扩展名视为按行文本
+    
+    Returns:
+        text、csv 或 json
+    """
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的格式: {fmt}，可选: {', '.join(FORMATS)}")
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension == ".json":
+        return "json"
+    return "text"
+
+
+def iter_user_ids(path: str, fmt: Optional[str] = None) -> Iterator[str]:
+    """
+    逐个读取文件中的用户ID（未校验）
+    
+    按行文本与 CSV 逐行读取；CSV 取每行第一列。JSON 须为ID数组，或包含
+    BanConfig_List 数组的对象，需整体解析。
+    
+    Args:
+        path: 文件路径
+        fmt: 文件格式，为空时按扩展名判断
+    
+    Yields:
+        去除首尾空白后的用户ID
+    """
+    fmt = detect_format(path, fmt)
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        if fmt == "csv":
+            for row in csv.reader(file):
+                if row:
+                    yield row[0].strip()
+        elif fmt == "json":
+            data = json.load(file)
+            if isinstance(data, dict):
+                data = data.get("BanConfig_List", [])
+            if not isinstance(data, list):
+                raise ValueError("JSON 须为用户ID数组")
+            for user_id in data:
+                yield str(user_id).strip()
+        else:
+            for line in file:
+                yield line.strip()
+
+
+def write_user_ids(path: str, user_ids: Iterable[str], fmt: Optional[str] = None) -> int:
+    """
+    流式写出用户ID，逐个写入文件，不在内存中拼接整个文件内容
+    
+    Args:
+        path: 文件路径
+        user_ids: 用户ID
+        fmt: 文件格式，为空时按扩展名判断
+    
+    Returns:
+        写出的用户ID数量
+    """
+    fmt = detect_format(path, fmt)
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        if fmt == "json":
+            file.write("[")
+            for user_id in user_ids:
+                file.write(f"{',' if count else ''}\n  {json.dumps(user_id)}")
+                count += 1
+            file.write("\n]\n" if count else "]\n")
+        else:
+            # 纯数字ID在 CSV 中无需转义，两种格式均为每行一个ID
+            for user_id in user_ids:
+                file.write(f"{user_id}\n")
+                count += 1
+    return count
@@ -0,0 +1,99 @@
+"""
+验证码图片渲染模块
+仅依赖标准库与 Pillow，以便在子进程中以较低的开销导入
+"""
+import base64
+import io
+import math
+import random
+from typing import Optional, Tuple
+
+
+def generate_math_problem(rng: Optional[random.Random] = None) -> Tuple[str, int]:
+    """
+    生成一个100以内的加减法问题
+    
+    Args:
+        rng: 随机数生成器，为空时使用全局随机数
+    
+    Returns:
+        Tuple[问题描述, 正确答案]
+    """
+    rng = rng or random
+    op_type = rng.choice(['add', 'sub'])
+    if op_type == 'add':
+        num1 = rng.randint(0, 100)
+        num2 = rng.randint(0, 100 - num1)
+        return f"{num1} + {num2} = ?", num1 + num2
+    else:
+        num1 = rng.randint(1, 100)
+        num2 = rng.randint(0, num1)
+        return f"{num1} - {num2} = ?", num1 - num2
+
+
+def render_math_image(seed: Optional[int] = None) -> Tuple[str, int, str]:
+    """
+    生成一个加减法问题并渲染为带干扰的图片
+    
+    该函数运行在进程池中，返回值须可被序列化。
+    
+    Args:
+        seed: 随机种子
+    
+    Returns:
+        Tuple[问题描述, 正确答案, PNG图片的base64编码]
+    """
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+    
+    rng = random.Random(seed)
+    question, answer = generate_math_problem(rng)
+    text = question.replace(" ", "")
+    
+    width, height = 32 + 34 * len(text), 72
+    background = (rng.randint(220, 255), rng.randint(220, 255), rng.randint(220, 255))
+    image = Image.new("RGB", (width, height), background)
+    try:
+        font = ImageFont.load_default(size=40)
+        glyph_size, scale_range = 52, (0.9, 1.1)
+    except TypeError:
+        # Pillow 10.1 以下的默认字体不支持指定字号，改为放大位图字体
+        font = ImageFont.load_default()
+        glyph_size, scale_range = 16, (2.6, 3.4)
+    
+    # 逐个字符缩放、旋转后贴到画布上
+    x = 16
+    for char in text:
+        glyph = Image.new("L", (glyph_size, glyph_size), 0)
+        ImageDraw.Draw(glyph).text((glyph_size // 2, glyph_size // 2), char, fill=255, font=font, anchor="mm")
+        side = int(glyph_size * rng.uniform(*scale_range))
+        glyph = glyph.resize((side, side), Image.BILINEAR)
+        glyph = glyph.rotate(rng.uniform(-25, 25), resample=Image.BILINEAR, expand=True)
+        glyph = glyph.crop(glyph.getbbox() or (0, 0, side, side))
+        color = (rng.randint(0, 100), rng.randint(0, 100), rng.randint(0, 100))
+        y = rng.randint(4, max(4, height - glyph.size[1] - 4))
+        image.paste(Image.new("RGB", glyph.size, color), (x, y), glyph)
+        x += glyph.size[0] + rng.randint(2, 8)
+    
+    # 干扰线与噪点
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randint(3, 5)):
+        points = [(rng.randint(0, width), rng.randint(0, height)) for _ in range(3)]
+        draw.line(points, fill=(rng.randint(80, 200), rng.randint(80, 200), rng.randint(80, 200)), width=1)
+    for _ in range(width * height // 40):
+        draw.point((rng.randint(0, width - 1), rng.randint(0, height - 1)),
+                   fill=(rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    
+    # 正弦波扭曲
+    amplitude = rng.uniform(2.0, 4.0)
+    period = rng.uniform(30.0, 60.0)
+    phase = rng.uniform(0, 2 * math.pi)
+    distorted = Image.new("RGB", (width, height), background)
+    for column in range(width):
+        offset = int(amplitude * math.sin(2 * math.pi * column / period + phase))
+        strip = image.crop((column, 0, column + 1, height))
+        distorted.paste(strip, (column, offset))
+    distorted = distorted.filter(ImageFilter.SMOOTH)
+    
+    buffer = io.BytesIO()
+    distorted.save(buffer, format="PNG", optimize=True)
+    return question, answer, base64.b64encode(buffer.getvalue()).decode("ascii")
@@ -0,0 +1,192 @@
+"""
+验证问题生成模块
+提供可替换的验证问题生成器，图片验证码在进程池中预先渲染
+"""
+import asyncio
+import importlib.util
+import multiprocessing
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Deque, Dict, Optional
+
+from astrbot.api import logger
+
+from .captcha_render import generate_math_problem, render_math_image
+from .metrics import metrics
+
+
+class Challenge:
+    """验证问题"""
+    
+    __slots__ = ("text", "answer", "question")
+    
+    def __init__(self, text: str, answer: int, question: str) -> None:
+        """
+        初始化验证问题
+        
+        Args:
+            text: 问题的文本描述，用于日志
+            answer: 正确答案
+            question: 发送给用户的内容，用于替换 {question} 占位符
+        """
+        self.text = text
+        self.answer = answer
+        self.question = question
+
+
+class ChallengeGenerator(ABC):
+    """验证问题生成器接口"""
+    
+    name = "Base"
+    
+    @abstractmethod
+    def generate(self) -> Challenge:
+        """
+        获取一个验证问题，该方法在事件循环中调用，不应执行耗时操作
+        
+        Returns:
+            验证问题
+        """
+    
+    def start(self) -> None:
+        """启动生成器所需的后台任务（如有）"""
+    
+    def shutdown(self) -> None:
+        """释放生成器占用的资源（如有）"""
+
+
+class TextMathChallenge(ChallengeGenerator):
+    """纯文本加减法验证"""
+    
+    name = "Text"
+    
+    def generate(self) -> Challenge:
+        question, answer = generate_math_problem()
+        return Challenge(question, answer, question)
+
+
+class ImageMathChallenge(ChallengeGenerator):
+    """
+    图片加减法验证
+    
+    图片在进程池中渲染，并在后台维持一个预渲染池，generate 只从池中取出现成的问题。
+    池为空时退回到文本验证，不会在事件循环中渲染图片。
+    """
+    
+    name = "Image"
+    
+    def __init__(self, prompt: str, pool_size: int, workers: int,
+                 fallback: Optional[ChallengeGenerator] = None) -> None:
+        """
+        初始化图片验证生成器
+        
+        Args:
+            prompt: 图片前附带的提示文本
+            pool_size: 预渲染池容量
+            workers: 渲染进程数量
+            fallback: 预渲染池为空时使用的生成器
+        """
+        self.prompt = prompt
+        self.pool_size = max(1, pool_size)
+        self.workers = max(1, workers)
+        self.fallback = fallback or TextMathChallenge()
+        self._ready: Deque[Challenge] = deque()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._refill_task: Optional[asyncio.Task] = None
+        self._hits = 0
+        self._requests = 0
+        self._disabled = importlib.util.find_spec("PIL") is None
+        if self._disabled:
+            logger.warning("[Authenticator] 未安装 Pillow，图片验证不可用，将使用文本验证。")
+    
+    def start(self) -> None:
+        """在事件循环中启动后台补充任务"""
+        if self._disabled:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # 尚无运行中的事件循环，首次取题时再启动
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+    
+    def generate(self) -> Challenge:
+        self._requests += 1
+        if self._ready:
+            challenge = self._ready.popleft()
+            self._hits += 1
+            metrics.incr("challenge.pool.hit")
+        else:
+            challenge = self.fallback.generate()
+            metrics.incr("challenge.pool.miss")
+        metrics.set_gauge("challenge.pool.hit_rate", self._hits / self._requests)
+        metrics.set_gauge("challenge.pool.size", len(self._ready))
+        self.start()
+        return challenge
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """获取（或创建）渲染进程池"""
+        if self._executor is None:
+            # 使用 spawn 避免在已有线程的进程中 fork
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+    
+    async def _render_one(self, loop: asyncio.AbstractEventLoop) -> Challenge:
+        """在进程池中渲染一个问题，并记录补充耗时"""
+        start = time.perf_counter()
+        question, answer, image = await loop.run_in_executor(
+            self._get_executor(), render_math_image, random.getrandbits(64)
+        )
+        metrics.observe("challenge.pool.refill", time.perf_counter() - start)
+        return Challenge(question, answer, f"{self.prompt}\n[CQ:image,file=base64://{image}]")
+    
+    async def _refill(self) -> None:
+        """将预渲染池补充到容量上限"""
+        loop = asyncio.get_running_loop()
+        try:
+            while len(self._ready) < self.pool_size:
+                batch = min(self.workers, self.pool_size - len(self._ready))
+                challenges = await asyncio.gather(*(self._render_one(loop) for _ in range(batch)))
+                self._ready.extend(challenges)
+                metrics.set_gauge("challenge.pool.size", len(self._ready))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 渲染失败（如子进程缺少依赖）时停止补充，之后一律使用文本验证
+            self._disabled = True
+            metrics.incr("challenge.pool.render_failed")
+            logger.error(f"[Authenticator] 渲染图片验证码失败，将改用文本验证: {e}")
+    
+    def shutdown(self) -> None:
+        if self._refill_task and not self._refill_task.done():
+            self._refill_task.cancel()
+        self._refill_task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._ready.clear()
+
+
+def create_challenge_generator(challenge_config: Dict[str, Any]) -> ChallengeGenerator:
+    """
+    根据配置创建验证问题生成器
+    
+    Args:
+        challenge_config: SimpleReCAPTCHA_ChallengeConfig 配置
+    
+    Returns:
+        验证问题生成器
+    """
+    if challenge_config["ChallengeConfig_Type"] == ImageMathChallenge.name:
+        return ImageMathChallenge(
+            challenge_config["ChallengeConfig_ImagePrompt"],
+            challenge_config["ChallengeConfig_PoolSize"],
+            challenge_config["ChallengeConfig_Workers"]
+        )
+    return TextMathChallenge()
@@ -0,0 +1,117 @@
+"""
+熔断器模块
+连续失败或调用过慢时暂时停止向协议端发起请求
+"""
+import time
+from typing import Optional
+
+from .metrics import metrics
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被直接拒绝"""
+
+
+class CircuitBreaker:
+    """单个协议端连接的熔断器"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int, slow_call_seconds: float, reset_seconds: float) -> None:
+        """
+        初始化熔断器
+        
+        Args:
+            failure_threshold: 连续失败（含超时与慢调用）多少次后打开熔断器
+            slow_call_seconds: 超过该耗时的调用视为失败，设为0以不统计慢调用
+            reset_seconds: 打开后经过多少秒允许一次试探调用
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0  # 最近一次打开（或试探失败）的时间
+        self._open_since: Optional[float] = None  # 本次熔断开始的时间
+        self._probing = False
+    
+    def allow(self, now: Optional[float] = None) -> bool:
+        """
+        检查是否允许发起调用
+        
+        Args:
+            now: 当前时间（单调时钟），为空时自动获取
+        """
+        if self.state == self.CLOSED:
+            return True
+        if now is None:
+            now = time.monotonic()
+        if self.state == self.OPEN and now - self._opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True  # 半开状态下同一时间只允许一次试探调用
+            return True
+        return False
+    
+    def is_available(self, now: Optional[float] = None) -> bool:
+        """检查熔断器当前是否会放行调用（不占用试探名额）"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN:
+            return not self._probing
+        if now is None:
+            now = time.monotonic()
+        return now - self._opened_at >= self.reset_seconds
+    
+    def record_success(self, duration: float) -> None:
+        """
+        记录一次成功的调用
+        
+        Args:
+            duration: 调用耗时（秒）
+        """
+        if self.slow_call_seconds > 0 and duration >= self.slow_call_seconds:
+            metrics.incr("napcat.slow_calls")
+            self.record_failure()
+            return
+        self._failures = 0
+        self._probing = False
+        if self.state != self.CLOSED:
+            self._close()
+    
+    def record_failure(self) -> None:
+        """记录一次失败的调用"""
+        now = time.monotonic()
+        self._failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self._opened_at = now
+        elif self.state == self.CLOSED and self._failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = now
+            self._open_since = now
+            metrics.incr("napcat.breaker.opened")
+    
+    def release_probe(self) -> None:
+        """试探调用被取消时归还试探名额"""
+        self._probing = False
+    
+    def open_seconds(self, now: Optional[float] = None) -> float:
+        """获取本次熔断已持续的时间（秒），未熔断时返回0"""
+        if self._open_since is None:
+            return 0.0
+        if now is None:
+            now = time.monotonic()
+        return now - self._open_since
+    
+    def _close(self) -> None:
+        """关闭熔断器并记录本次熔断的持续时间"""
+        if self._open_since is not None:
+            metrics.observe("napcat.breaker.open_duration", time.monotonic() - self._open_since)
+        self.state = self.CLOSED
+        self._open_since = None
+        metrics.incr("napcat.breaker.closed")
@@ -0,0 +1,60 @@
+"""
+事件去重缓存模块
+使用容量与存活时间均有上限的 LRU 缓存记录已处理的事件
+"""
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class DedupCache:
+    """有界 LRU/TTL 去重缓存"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        """
+        初始化去重缓存
+        
+        Args:
+            max_entries: 最多记录的事件数量，超出时淘汰最久未见的事件
+            ttl_seconds: 事件记录的存活时间（秒）
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+    
+    def seen(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """
+        检查事件是否已在存活时间内出现过，并记录本次出现
+        
+        Args:
+            key: 事件标识
+            now: 当前时间（单调时钟），为空时自动获取
+            
+        Returns:
+            是否为重复事件
+        """
+        if now is None:
+            now = time.monotonic()
+        
+        expires = self._entries.get(key)
+        if expires is not None and expires > now:
+            self._entries.move_to_end(key)
+            return True
+        
+        self._entries[key] = now + self.ttl_seconds
+        self._entries.move_to_end(key)
+        
+        # 淘汰过期及超出容量的记录（最旧的记录总在队首）
+        while self._entries:
+            oldest_key, oldest_expires = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and oldest_expires > now:
+                break
+            self._entries.popitem(last=False)
+        return False
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
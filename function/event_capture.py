@@ -0,0 +1,144 @@
+"""
+事件录制模块
+将收到的原始事件写入 gzip 压缩的 JSONL 文件，供 function/replay.py 离线回放
+"""
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from astrbot.api import logger
+
+from .metrics import metrics
+
+# 通知后台写入线程退出的标记
+_STOP = object()
+
+
+class EventCapture:
+    """
+    事件录制器
+    
+    事件在事件循环中只做一次入队，序列化、压缩与写盘均在后台线程中完成；
+    队列已满时直接丢弃事件，不会阻塞事件处理。
+    """
+    
+    def __init__(self, config: Dict[str, Any]) -> None:
+        """
+        初始化事件录制器
+        
+        Args:
+            config: 插件配置
+        """
+        capture_config = config["EventCapture"]
+        self.enabled = capture_config["EventCapture_Enable"]
+        self.directory = capture_config["EventCapture_Directory"]
+        self.path: Optional[str] = None
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, capture_config["EventCapture_MaxQueue"]))
+        self._writer: Optional[threading.Thread] = None
+    
+    def record(self, event: Any, raw: Dict[str, Any]) -> None:
+        """
+        录制一个事件
+        
+        Args:
+            event: 消息事件
+            raw: 事件的原始数据
+        """
+        if not self.enabled:
+            return
+        if self._writer is None and not self._start():
+            return
+        
+        self._enqueue({
+            "time": time.time(),
+            "self_id": str(event.get_self_id()),
+            "message_str": event.message_str,
+            "raw": raw,
+        })
+    
+    def record_challenge(self, uid: str, gid: int, text: str, answer: int) -> None:
+        """
+        录制发给成员的验证问题，回放时据此还原同样的问题与答案
+        
+        Args:
+            uid: 用户ID
+            gid: 群ID
+            text: 问题的文本描述
+            answer: 正确答案
+        """
+        # 验证问题总是由已录制的入群或回答事件触发，录制未开始时无需记录
+        if not self.enabled or self._writer is None:
+            return
+        self._enqueue({
+            "time": time.time(),
+            "challenge": {"user_id": uid, "group_id": gid, "text": text, "answer": answer},
+        })
+    
+    def _enqueue(self, record: Dict[str, Any]) -> None:
+        """将一条记录交给后台写入线程，队列已满时丢弃"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            metrics.incr("capture.dropped")
+            return
+        metrics.incr("capture.recorded")
+    
+    def _start(self) -> bool:
+        """
+        创建录制目录并启动后台写入线程
+        
+        Returns:
+            是否成功启动；目录无法创建时关闭录制，不影响事件处理
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            self.enabled = False
+            logger.error(f"[Authenticator] 无法创建事件录制目录 {self.directory}，已停止录制: {e}")
+            return False
+        self.path = os.path.join(self.directory, time.strftime("capture-%Y%m%d-%H%M%S.jsonl.gz"))
+        self._writer = threading.Thread(target=self._write_loop, name="authenticator-capture", daemon=True)
+        self._writer.start()
+        logger.info(f"[Authenticator] 事件录制已开始，写入文件: {self.path}")
+        return True
+    
+    def _write_loop(self) -> None:
+        """后台线程：逐条写入事件，队列暂时为空时刷新到磁盘"""
+        try:
+            with gzip.open(self.path, "wt", encoding="utf-8") as file:
+                while True:
+                    try:
+                        record = self._queue.get(timeout=1)
+                    except queue.Empty:
+                        file.flush()
+                        continue
+                    if record is _STOP:
+                        break
+                    file.write(json.dumps(record, ensure_ascii=False, default=str))
+                    file.write("\n")
+        except Exception as e:
+            self.enabled = False
+            logger.error(f"[Authenticator] 写入事件录制文件失败，已停止录制: {e}")
+    
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        停止录制，等待已入队的事件写入完毕
+        
+        Args:
+            timeout: 最长等待时间（秒）
+        """
+        self.enabled = False
+        writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("[Authenticator] 事件录制队列已满，部分事件可能未写入。")
+            return
+        writer.join(timeout)
+        logger.info(f"[Authenticator] 事件录制已结束: {self.path}")
@@ -0,0 +1,197 @@
+"""
+分群配置模块
+将每个群的覆盖配置与全局配置合并后编译为按群号索引的配置表，设置相同的群共享同一份编译结果
+"""
+import json
+from functools import lru_cache
+from typing import Any, Callable, Dict, Generic, Iterable, List, Tuple, TypeVar
+
+from astrbot.api import logger
+
+T = TypeVar("T")
+
+# 加群审核可按群覆盖的配置项
+REVIEW_FIELDS = (
+    "AcceptKeywords",
+    "RejectKeywords",
+    "AutoReject",
+    "RejectReason",
+    "LevelRestriction",
+    "LevelRejectReason",
+    "DelaySeconds",
+)
+
+# 入群验证可按群覆盖的配置项
+VERIFICATION_FIELDS = (
+    "VerificationTimeout",
+    "KickDelay",
+    "JoinMessage",
+    "SuccessMessage",
+    "WrongMessage",
+    "CountdownWarningTime",
+    "CountdownWarningMessage",
+    "FailureMessage",
+    "KickMessage",
+)
+
+
+def _freeze(value: Any) -> Any:
+    """将配置值转换为可哈希的形式，用于判断两份配置是否相同"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _matches_default_type(value: Any, default: Any) -> bool:
+    """
+    检查覆盖值的类型是否与全局配置一致
+    
+    列表类配置（关键词）须为字符串列表；布尔值不视为整数。
+    """
+    if isinstance(default, bool):
+        return isinstance(value, bool)
+    if isinstance(default, (int, float)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return isinstance(value, int) or isinstance(default, float)
+    if isinstance(default, list):
+        return isinstance(value, list) and all(isinstance(item, str) for item in value)
+    return isinstance(value, type(default))
+
+
+def _parse_groups(groups: Any) -> List[str]:
+    """将 Groups 解析为群号列表，群号须为整数或纯数字字符串，其余返回空列表"""
+    if not isinstance(groups, list):
+        return []
+    return [
+        str(group_id).strip() for group_id in groups
+        if (isinstance(group_id, int) and not isinstance(group_id, bool))
+        or (isinstance(group_id, str) and group_id.strip().isdigit())
+    ]
+
+
+@lru_cache(maxsize=1)
+def _load_profiles(text: str) -> Tuple[Tuple[int, Tuple[str, ...], Dict[str, Any]], ...]:
+    """
+    解析分群配置的 JSON 文本，检查 Groups 与配置项名称
+    
+    加群审核与入群验证模块会先后解析同一份配置，结果按文本缓存，格式警告只记录一次。
+    
+    Returns:
+        ((序号, 群号, 已知的配置项), ...)，返回的字典不应修改
+    """
+    try:
+        profiles = json.loads(text or "[]")
+        if not isinstance(profiles, list):
+            raise ValueError("顶层须为数组")
+    except ValueError as e:
+        logger.error(f"[Authenticator] 分群配置解析失败，将对所有群使用全局配置: {e}")
+        return ()
+    
+    known_fields = set(REVIEW_FIELDS) | set(VERIFICATION_FIELDS)
+    parsed = []
+    for index, profile in enumerate(profiles, 1):
+        groups = _parse_groups(profile.get("Groups")) if isinstance(profile, dict) else []
+        if not groups:
+            logger.warning(f"[Authenticator] 第 {index} 项分群配置缺少 Groups 或 Groups 不是群号数组，已忽略。")
+            continue
+        if len(groups) != len(profile["Groups"]):
+            logger.warning(f"[Authenticator] 第 {index} 项分群配置的 Groups 中包含无效的群号，已忽略这些群号。")
+        
+        unknown = [key for key in profile if key != "Groups" and key not in known_fields]
+        if unknown:
+            logger.warning(f"[Authenticator] 第 {index} 项分群配置包含未知的配置项 {unknown}，已忽略。")
+        fields = {key: value for key, value in profile.items() if key in known_fields}
+        parsed.append((index, tuple(groups), fields))
+    return tuple(parsed)
+
+
+def parse_group_profiles(config: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    解析分群配置
+    
+    配置为 JSON 数组，每项包含 Groups（群号列表）以及需要覆盖的配置项，
+    同一个群出现在多项中时以靠后的一项为准。只保留 defaults 中存在、且类型与
+    全局配置一致的配置项，格式错误的项或配置项会记录警告并跳过。
+    
+    Args:
+        config: 插件配置
+        defaults: 调用模块的全局配置，配置项名称 -> 全局值
+    
+    Returns:
+        群号 -> 覆盖的配置项，未启用或解析失败时返回空字典
+    """
+    profiles_config = config["GroupProfiles"]
+    if not profiles_config["GroupProfiles_Enable"]:
+        return {}
+    
+    overrides: Dict[str, Dict[str, Any]] = {}
+    for index, groups, profile in _load_profiles(profiles_config["GroupProfiles_Profiles"]):
+        fields = {}
+        for key, value in profile.items():
+            if key not in defaults:
+                continue  # 由另一个模块处理
+            if _matches_default_type(value, defaults[key]):
+                fields[key] = value
+            else:
+                expected = "字符串数组" if isinstance(defaults[key], list) else type(defaults[key]).__name__
+                logger.warning(f"[Authenticator] 第 {index} 项分群配置的 {key} 须为 {expected}，已忽略该配置项。")
+        
+        for group_id in groups:
+            overrides.setdefault(group_id, {}).update(fields)
+    return overrides
+
+
+class ProfileIndex(Generic[T]):
+    """
+    按群号索引的已编译配置表
+    
+    合并后设置相同的群共享同一个编译结果，查询时只需一次字典查找。
+    """
+    
+    def __init__(self, base: Dict[str, Any], overrides: Dict[str, Dict[str, Any]],
+                 fields: Iterable[str], compile: Callable[[Dict[str, Any]], T]) -> None:
+        """
+        编译配置表
+        
+        Args:
+            base: 全局配置
+            overrides: 群号 -> 覆盖的配置项
+            fields: 该模块关心的配置项，其余覆盖项不影响本模块的编译结果
+            compile: 将合并后的配置编译为配置对象的函数
+        """
+        fields = tuple(fields)
+        compiled: Dict[Tuple, T] = {}
+        
+        def build(settings: Dict[str, Any]) -> T:
+            key = _freeze({field: settings[field] for field in fields})
+            profile = compiled.get(key)
+            if profile is None:
+                profile = compiled[key] = compile(settings)
+            return profile
+        
+        self.default: T = build(base)
+        self._index: Dict[Any, T] = {}
+        for group_id, override in overrides.items():
+            profile = build({**base, **override})
+            if profile is self.default:
+                continue
+            # 同时以字符串与整数群号建立索引，调用方无需转换类型
+            self._index[group_id] = profile
+            if group_id.isdigit():
+                self._index[int(group_id)] = profile
+        self.compiled_count = len(compiled)
+    
+    def get(self, group_id: Any) -> T:
+        """
+        获取群的配置
+        
+        Args:
+            group_id: 群号（字符串或整数）
+        
+        Returns:
+            该群的配置，未单独配置的群返回全局配置
+        """
+        return self._index.get(group_id, self.default)
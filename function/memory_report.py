@@ -0,0 +1,225 @@
+"""
+内存分析模块
+估算插件持有的各个数据结构的内存占用，并按需对比 tracemalloc 快照
+"""
+import asyncio
+import os
+import sys
+import tracemalloc
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# 插件根目录与包名，用于识别插件自身的对象、协程与内存分配
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_PACKAGE = (__package__ or "").rpartition(".")[0]
+
+_CONTAINERS = (dict, list, tuple, set, frozenset, deque)
+
+
+def _is_plugin_object(obj: Any) -> bool:
+    """检查对象是否为插件自身定义的类的实例"""
+    module = type(obj).__module__ or ""
+    return bool(PLUGIN_PACKAGE) and module.startswith(PLUGIN_PACKAGE + ".")
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    估算对象及其引用的内容占用的内存
+    
+    只展开容器与插件自身的对象；机器人实例、事件等外部对象只计算其本身，
+    协程任务计算任务、协程与栈帧本身。
+    
+    Args:
+        obj: 要估算的对象
+        seen: 已统计过的对象ID，避免重复统计
+    
+    Returns:
+        估算的字节数
+    """
+    if seen is None:
+        seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, _CONTAINERS):
+            stack.extend(item)
+        elif isinstance(item, asyncio.Future):
+            coro = item.get_coro() if isinstance(item, asyncio.Task) else None
+            if coro is not None:
+                total += sys.getsizeof(coro)
+                frame = getattr(coro, "cr_frame", None)
+                if frame is not None:
+                    total += sys.getsizeof(frame)
+        elif _is_plugin_object(item):
+            if hasattr(item, "__dict__"):
+                stack.append(vars(item))
+            for slot in getattr(type(item), "__slots__", ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
+
+
+def _format_size(size: float) -> str:
+    """格式化字节数"""
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+class MemoryInspector:
+    """插件内存分析器"""
+    
+    def __init__(self, top_n: int = 10, frames: int = 10) -> None:
+        """
+        初始化内存分析器
+        
+        Args:
+            top_n: 快照对比时列出的代码位置数量
+            frames: tracemalloc 记录的调用栈深度
+        """
+        self.top_n = top_n
+        self.frames = frames
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        # 是否由本分析器开启了 tracemalloc，只停止自己开启的跟踪
+        self._started_tracing = False
+    
+    def collect(self, components: Dict[str, Any]) -> List[Tuple[str, int, int]]:
+        """
+        统计各模块持有的数据结构
+        
+        Args:
+            components: 模块名称 -> 模块对象
+        
+        Returns:
+            [(名称, 条目数, 估算字节数)]，无法估算字节数时为 -1
+        """
+        top_level = {id(component) for component in components.values()}
+        rows: List[Tuple[str, int, int]] = []
+        
+        def walk(prefix: str, obj: Any, depth: int) -> None:
+            for name, value in vars(obj).items():
+                label = f"{prefix}.{name}"
+                if id(value) in top_level:
+                    continue  # 其他模块的引用，单独统计
+                if isinstance(value, _CONTAINERS):
+                    rows.append((label, len(value), deep_sizeof(value)))
+                elif isinstance(value, asyncio.Queue):
+                    rows.append((label, value.qsize(), deep_sizeof(getattr(value, "_queue", ()))))
+                elif callable(getattr(value, "cache_info", None)):
+                    rows.append((label, value.cache_info().currsize, -1))
+                elif _is_plugin_object(value) and hasattr(value, "__dict__") and depth < 2:
+                    walk(label, value, depth + 1)
+        
+        for name, component in components.items():
+            walk(name, component, 0)
+        return rows
+    
+    @staticmethod
+    def plugin_tasks() -> Dict[str, int]:
+        """
+        统计由插件代码创建、尚未结束的协程任务
+        
+        Returns:
+            协程名称 -> 任务数量
+        """
+        try:
+            tasks = asyncio.all_tasks()
+        except RuntimeError:
+            return {}
+        counts: Dict[str, int] = {}
+        for task in tasks:
+            code = getattr(task.get_coro(), "cr_code", None)
+            if code is not None and code.co_filename.startswith(PLUGIN_DIR):
+                name = getattr(code, "co_qualname", code.co_name)
+                counts[name] = counts.get(name, 0) + 1
+        return counts
+    
+    def render(self, components: Dict[str, Any]) -> str:
+        """
+        生成内存占用报告
+        
+        Args:
+            components: 模块名称 -> 模块对象
+        """
+        rows = self.collect(components)
+        lines = ["数据结构（条目数 / 估算内存）:"]
+        total = 0
+        for label, count, size in sorted(rows, key=lambda row: row[2], reverse=True):
+            if count == 0:
+                continue
+            lines.append(f"- {label}: {count} 项 / {_format_size(size) if size >= 0 else '未知'}")
+            total += max(size, 0)
+        lines.append(f"合计: {_format_size(total)}")
+        
+        tasks = self.plugin_tasks()
+        lines.append(f"协程任务: {sum(tasks.values())} 个")
+        for name, count in sorted(tasks.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"- {name}: {count}")
+        
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append(f"tracemalloc: 当前 {_format_size(current)}，峰值 {_format_size(peak)}")
+        return "\n".join(lines)
+    
+    def snapshot_diff(self) -> str:
+        """
+        对比 tracemalloc 快照
+        
+        首次调用时开始跟踪并记录基准快照，之后每次调用与上一次快照对比，
+        只列出插件自身代码中的内存分配变化。
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+            self._baseline = None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(True, os.path.join(PLUGIN_DIR, "*"), all_frames=True),
+            tracemalloc.Filter(False, __file__),  # 排除分析器自身的分配
+        ))
+        baseline, self._baseline = self._baseline, snapshot
+        if baseline is None:
+            return "已开始跟踪内存分配并记录基准快照，稍后再次执行以查看变化。"
+        
+        # 按调用栈中最靠近分配位置的插件代码行汇总
+        changes: Dict[str, List[int]] = {}
+        for stat in snapshot.compare_to(baseline, "traceback"):
+            if not stat.size_diff and not stat.count_diff:
+                continue
+            location = "未知位置"
+            for frame in reversed(stat.traceback):
+                if frame.filename.startswith(PLUGIN_DIR):
+                    location = f"{os.path.relpath(frame.filename, PLUGIN_DIR)}:{frame.lineno}"
+                    break
+            change = changes.setdefault(location, [0, 0])
+            change[0] += stat.size_diff
+            change[1] += stat.count_diff
+        
+        if not changes:
+            return "与上一次快照相比，插件代码没有新的内存分配变化。"
+        lines = ["与上一次快照相比的内存分配变化（插件代码）:"]
+        ranked = sorted(changes.items(), key=lambda item: abs(item[1][0]), reverse=True)
+        for location, (size_diff, count_diff) in ranked[:self.top_n]:
+            lines.append(f"- {location}: {'+' if size_diff >= 0 else '-'}{_format_size(abs(size_diff))}，{count_diff:+d} 个对象")
+        return "\n".join(lines)
+    
+    def stop(self) -> str:
+        """停止跟踪内存分配，由其他代码开启的跟踪保持不变"""
+        self._baseline = None
+        started, self._started_tracing = self._started_tracing, False
+        if not tracemalloc.is_tracing():
+            return "当前未在跟踪内存分配。"
+        if not started:
+            return "内存分配跟踪并非由本插件开启，已清除基准快照，跟踪保持开启。"
+        tracemalloc.stop()
+        return "已停止跟踪内存分配。"
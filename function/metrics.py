@@ -0,0 +1,84 @@
+"""
+运行指标模块
+提供插件内部使用的计数器、状态值与耗时统计
+"""
+import threading
+from typing import Dict, Any
+
+
+class Metrics:
+    """插件运行指标收集器"""
+    
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+    
+    def incr(self, name: str, value: int = 1) -> None:
+        """
+        累加计数器
+        
+        Args:
+            name: 指标名称
+            value: 增加的数值
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+    
+    def set_gauge(self, name: str, value: float) -> None:
+        """
+        设置状态值
+        
+        Args:
+            name: 指标名称
+            value: 当前值
+        """
+        with self._lock:
+            self.gauges[name] = value
+    
+    def observe(self, name: str, seconds: float) -> None:
+        """
+        记录一次耗时
+        
+        Args:
+            name: 指标名称
+            seconds: 耗时（秒）
+        """
+        with self._lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = {"count": 0, "total": 0.0, "max": 0.0}
+            timing["count"] += 1
+            timing["total"] += seconds
+            if seconds > timing["max"]:
+                timing["max"] = seconds
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """获取当前全部指标的副本"""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "timings": {name: dict(data) for name, data in self.timings.items()},
+            }
+    
+    def render(self) -> str:
+        """将指标格式化为可读文本"""
+        data = self.snapshot()
+        lines = ["[Authenticator] 运行指标"]
+        for name in sorted(data["counters"]):
+            lines.append(f"{name} = {data['counters'][name]}")
+        for name in sorted(data["gauges"]):
+            lines.append(f"{name} = {data['gauges'][name]:g}")
+        for name in sorted(data["timings"]):
+            timing = data["timings"][name]
+            avg = timing["total"] / timing["count"] if timing["count"] else 0.0
+            lines.append(f"{name}: 次数={timing['count']}, 平均={avg * 1000:.2f}ms, 最大={timing['max'] * 1000:.2f}ms")
+        if len(lines) == 1:
+            lines.append("暂无数据。")
+        return "\n".join(lines)
+
+
+# 插件全局共享的指标实例
+metrics = Metrics()
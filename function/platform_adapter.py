@@ -0,0 +1,140 @@
+"""
+平台适配模块
+按机器人实例解析一次平台并缓存对应的适配器，为各模块提供统一的协议端操作
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple, Type
+
+from astrbot.api import logger
+
+from .api_guard import ApiGuard
+from .apifox_model import ApifoxModel
+
+
+class PlatformAdapter(ABC):
+    """
+    协议端适配器基类
+    
+    持有某一机器人实例的客户端句柄，所有操作都经过协议端调用保护器。
+    支持新的平台时继承此类，实现各个操作并在 ADAPTERS 中登记。
+    """
+    
+    platform = ""
+    
+    def __init__(self, client: Any, api_guard: ApiGuard) -> None:
+        """
+        初始化适配器
+        
+        Args:
+            client: 协议端客户端
+            api_guard: 协议端调用保护器
+        """
+        self.client = client
+        self.api_guard = api_guard
+    
+    def is_available(self) -> bool:
+        """检查协议端当前是否可用（熔断器未打开）"""
+        return self.api_guard.is_available(self.client)
+    
+    @abstractmethod
+    async def send_group_msg(self, group_id: int, message: str) -> Any:
+        """发送群消息"""
+    
+    @abstractmethod
+    async def set_group_kick(self, group_id: int, user_id: int, reject_add_request: bool = False) -> Any:
+        """将成员踢出群聊"""
+    
+    @abstractmethod
+    async def set_group_add_request(self, flag: str, approve: bool, reason: str = "") -> Any:
+        """同意或拒绝加群请求"""
+    
+    @abstractmethod
+    async def get_stranger_info(self, user_id: int, no_cache: bool = True) -> Dict[str, Any]:
+        """获取用户信息"""
+    
+    @abstractmethod
+    async def get_group_member_info(self, group_id: int, user_id: int) -> Dict[str, Any]:
+        """获取群成员信息"""
+
+
+class AiocqhttpAdapter(PlatformAdapter):
+    """aiocqhttp（OneBot v11 / NapCat）适配器"""
+    
+    platform = "aiocqhttp"
+    
+    async def send_group_msg(self, group_id: int, message: str) -> Any:
+        return await self.api_guard.call(self.client, "send_group_msg", group_id=group_id, message=message)
+    
+    async def set_group_kick(self, group_id: int, user_id: int, reject_add_request: bool = False) -> Any:
+        return await self.api_guard.call(
+            self.client, "set_group_kick",
+            group_id=group_id, user_id=user_id, reject_add_request=reject_add_request
+        )
+    
+    async def set_group_add_request(self, flag: str, approve: bool, reason: str = "") -> Any:
+        api_model = ApifoxModel(approve=approve, flag=flag, reason=reason)
+        return await self.api_guard.call(
+            self.client, "set_group_add_request",
+            flag=api_model.flag, sub_type="add", approve=api_model.approve, reason=api_model.reason or ""
+        )
+    
+    async def get_stranger_info(self, user_id: int, no_cache: bool = True) -> Dict[str, Any]:
+        return await self.api_guard.call(self.client, "get_stranger_info", user_id=user_id, no_cache=no_cache)
+    
+    async def get_group_member_info(self, group_id: int, user_id: int) -> Dict[str, Any]:
+        return await self.api_guard.call(self.client, "get_group_member_info", group_id=group_id, user_id=user_id)
+
+
+# 平台名称 -> 适配器类
+ADAPTERS: Dict[str, Type[PlatformAdapter]] = {
+    AiocqhttpAdapter.platform: AiocqhttpAdapter,
+}
+
+
+class PlatformRegistry:
+    """
+    适配器缓存
+    
+    每个机器人实例只在第一次遇到时检查平台并创建适配器，之后的事件直接取缓存；
+    不支持的平台同样缓存结果，不会反复检查。
+    """
+    
+    def __init__(self, api_guard: ApiGuard) -> None:
+        """
+        初始化适配器缓存
+        
+        Args:
+            api_guard: 协议端调用保护器
+        """
+        self.api_guard = api_guard
+        # id(客户端) -> (客户端, 适配器)，保留客户端引用以免ID被复用
+        self._adapters: Dict[int, Tuple[Any, Optional[PlatformAdapter]]] = {}
+    
+    def for_event(self, event: Any) -> Optional[PlatformAdapter]:
+        """
+        获取事件所属机器人实例的适配器
+        
+        Args:
+            event: 消息事件
+        
+        Returns:
+            适配器，平台不受支持时返回None
+        """
+        client = getattr(event, "bot", None)
+        if client is None:
+            return None
+        cached = self._adapters.get(id(client))
+        if cached is not None and cached[0] is client:
+            return cached[1]
+        
+        platform = event.get_platform_name()
+        adapter_class = ADAPTERS.get(platform)
+        adapter = adapter_class(client, self.api_guard) if adapter_class else None
+        if adapter is None:
+            logger.debug(f"[Authenticator] 检测到不受支持的平台({platform})，该平台的事件将被跳过。")
+        self._adapters[id(client)] = (client, adapter)
+        return adapter
+    
+    def cleanup(self) -> None:
+        """清理资源"""
+        self._adapters.clear()
@@ -0,0 +1,388 @@
+"""
+事件回放工具
+将 EventCapture 录制的事件按原始节奏（或加速）重新送入插件，记录插件对协议端发起的调用，
+并可与上一次回放的结果对比。默认使用虚拟时间，验证超时等计时器无需真实等待。
+
+用法（在 AstrBot 根目录下执行）：
+    python data/plugins/<插件目录>/function/replay.py capture.jsonl.gz --output actions.jsonl
+    python data/plugins/<插件目录>/function/replay.py capture.jsonl.gz --baseline actions.jsonl
+"""
+import argparse
+import asyncio
+import contextlib
+import difflib
+import gzip
+import importlib
+import json
+import os
+import random
+import selectors
+import sys
+import time
+import types
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLUGIN_PACKAGE = "authenticator_replay"
+
+
+class VirtualClock:
+    """虚拟时钟，事件循环空闲时直接跳到下一个计时器的到期时间"""
+    
+    def __init__(self) -> None:
+        self.now = time.monotonic()
+        self.start = self.now
+    
+    def time(self) -> float:
+        """当前虚拟时间"""
+        return self.now
+    
+    def elapsed(self) -> float:
+        """自回放开始经过的虚拟时间"""
+        return self.now - self.start
+
+
+class VirtualSelector(selectors.DefaultSelector):
+    """没有就绪的 I/O 时推进虚拟时钟而不是真正等待的选择器"""
+    
+    def __init__(self, clock: VirtualClock) -> None:
+        super().__init__()
+        self.clock = clock
+    
+    def select(self, timeout: Optional[float] = None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            # 没有任何计时器，只可能在等待线程或进程池的结果
+            return super().select(None)
+        self.clock.now += timeout
+        return []
+
+
+@contextlib.contextmanager
+def virtual_time(clock: VirtualClock) -> Iterator[asyncio.AbstractEventLoop]:
+    """
+    创建使用虚拟时间的事件循环，并让 time.monotonic 返回虚拟时间
+    
+    Args:
+        clock: 虚拟时钟
+    """
+    loop = asyncio.SelectorEventLoop(VirtualSelector(clock))
+    loop.time = clock.time
+    real_monotonic = time.monotonic
+    time.monotonic = clock.time
+    try:
+        yield loop
+    finally:
+        time.monotonic = real_monotonic
+        loop.close()
+
+
+class ReplayBot:
+    """记录所有调用的协议端替身"""
+    
+    def __init__(self, clock_start: float, latency: float = 0.0, level: int = 64) -> None:
+        """
+        初始化协议端替身
+        
+        Args:
+            clock_start: 回放开始时的时间，调用时间以此为起点记录
+            latency: 每次调用的模拟耗时（秒）
+            level: get_stranger_info 返回的QQ等级
+        """
+        self.api = self
+        self.actions: List[Dict[str, Any]] = []
+        self.clock_start = clock_start
+        self.latency = latency
+        self.level = level
+    
+    async def call_action(self, action: str, **params: Any) -> Dict[str, Any]:
+        self.actions.append({
+            "time": round(time.monotonic() - self.clock_start, 3),
+            "action": action,
+            "params": params,
+        })
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if action == "get_stranger_info":
+            return {"user_id": params.get("user_id"), "qqLevel": self.level}
+        if action == "get_group_member_info":
+            return {"user_id": params.get("user_id"), "nickname": str(params.get("user_id")), "card": ""}
+        return {}
+
+
+def load_plugin(plugin_dir: str = PLUGIN_DIR) -> types.ModuleType:
+    """
+    以独立包名导入插件的 main 模块
+    
+    Args:
+        plugin_dir: 插件目录
+    
+    Returns:
+        插件的 main 模块
+    """
+    package = types.ModuleType(PLUGIN_PACKAGE)
+    package.__path__ = [plugin_dir]
+    sys.modules[PLUGIN_PACKAGE] = package
+    return importlib.import_module(f"{PLUGIN_PACKAGE}.main")
+
+
+def default_config(plugin_dir: str = PLUGIN_DIR) -> Dict[str, Any]:
+    """
+    根据 _conf_schema.json 生成默认配置
+    
+    Args:
+        plugin_dir: 插件目录
+    """
+    def build(schema: Dict[str, Any]) -> Dict[str, Any]:
+        config = {}
+        for key, item in schema.items():
+            if item.get("type") == "object":
+                config[key] = build(item["items"])
+            else:
+                config[key] = item.get("default")
+        return config
+    
+    with open(os.path.join(plugin_dir, "_conf_schema.json"), encoding="utf-8") as file:
+        return build(json.load(file))
+
+
+def merge_config(config: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """将覆盖配置递归合并到配置中"""
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            merge_config(config[key], value)
+        else:
+            config[key] = value
+    return config
+
+
+def read_capture(path: str) -> List[Dict[str, Any]]:
+    """读取录制文件（支持 gzip 压缩与未压缩的 JSONL），按时间排序"""
+    opener = gzip.open if path.endswith(".gz") else open
+    records = []
+    with opener(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    records.sort(key=lambda record: record["time"])
+    return records
+
+
+def use_recorded_challenges(recaptcha: Any, records: List[Dict[str, Any]]) -> int:
+    """
+    让验证模块按录制时的顺序向每个成员发出录制下来的验证问题，
+    使录制中的回答与回放时的答案对应；没有录制问题的成员仍随机生成
+    
+    Args:
+        recaptcha: 插件的验证模块
+        records: 录制中的验证问题记录
+    
+    Returns:
+        录制的验证问题数量
+    """
+    challenge_module = importlib.import_module(f"{PLUGIN_PACKAGE}.function.challenge")
+    recorded: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = {}
+    for record in records:
+        challenge = record["challenge"]
+        recorded.setdefault((str(challenge["group_id"]), str(challenge["user_id"])), deque()).append(challenge)
+    issue = recaptcha._issue_challenge
+    
+    def replay_challenge(uid: str, gid: int):
+        challenges = recorded.get((str(gid), str(uid)))
+        if not challenges:
+            return issue(uid, gid)
+        challenge = challenges.popleft()
+        return challenge_module.Challenge(challenge["text"], challenge["answer"], challenge["text"])
+    
+    recaptcha._issue_challenge = replay_challenge
+    return len(records)
+
+
+def make_event_factory():
+    """创建回放事件类，需在导入插件之后调用以便使用 AstrBot 的事件类型"""
+    from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import AiocqhttpMessageEvent
+    
+    class ReplayMessage:
+        def __init__(self, raw: Dict[str, Any]) -> None:
+            self.raw_message = raw
+            self.session_id = "replay"
+    
+    class ReplayEvent(AiocqhttpMessageEvent):
+        """绕过平台初始化、仅提供插件所需接口的事件"""
+        
+        def __init__(self, record: Dict[str, Any], bot: ReplayBot) -> None:
+            self.message_obj = ReplayMessage(record["raw"])
+            self.message_str = record.get("message_str", "")
+            self.bot = bot
+            self._self_id = record.get("self_id", "")
+            self._stopped = False
+        
+        def get_platform_name(self) -> str:
+            return "aiocqhttp"
+        
+        def get_sender_id(self) -> str:
+            return str(self.message_obj.raw_message.get("user_id", ""))
+        
+        def get_self_id(self) -> str:
+            return self._self_id
+        
+        def stop_event(self) -> None:
+            self._stopped = True
+        
+        def plain_result(self, text: str) -> str:
+            return text
+    
+    return ReplayEvent
+
+
+async def replay(plugin_main: types.ModuleType, config: Dict[str, Any], records: List[Dict[str, Any]],
+                 speed: float, latency: float, level: int, settle: float) -> Dict[str, Any]:
+    """
+    回放事件
+    
+    Args:
+        plugin_main: 插件的 main 模块
+        config: 插件配置
+        records: 录制的事件与验证问题
+        speed: 回放倍速，事件间隔除以该值
+        latency: 每次协议端调用的模拟耗时（秒）
+        level: 模拟的QQ等级
+        settle: 最后一个事件之后继续运行的时间（秒），用于让计时器到期
+    
+    Returns:
+        回放报告
+    """
+    ReplayEvent = make_event_factory()
+    start = time.monotonic()
+    bot = ReplayBot(start, latency, level)
+    plugin = plugin_main.AuthenticatorPlugin(None, config)
+    challenges = use_recorded_challenges(plugin.recaptcha, [record for record in records if "challenge" in record])
+    records = [record for record in records if "challenge" not in record]
+    
+    tasks = []
+    wall_start = time.perf_counter()
+    first = records[0]["time"] if records else 0.0
+    for record in records:
+        wait = start + (record["time"] - first) / speed - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        tasks.append(asyncio.create_task(plugin.handle_event(ReplayEvent(record, bot))))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    handled_wall = time.perf_counter() - wall_start
+    
+    await asyncio.sleep(settle)
+    await plugin.terminate()
+    
+    return {
+        "events": len(records),
+        "challenges": challenges,
+        "errors": [repr(result) for result in results if isinstance(result, BaseException)],
+        "wall_seconds": time.perf_counter() - wall_start,
+        "handled_wall_seconds": handled_wall,
+        "replayed_seconds": time.monotonic() - start,
+        "actions": bot.actions,
+        "metrics": plugin_main.metrics.render(),
+    }
+
+
+def canonical_actions(actions: List[Dict[str, Any]]) -> List[str]:
+    """将调用记录转换为便于对比的文本行（不含时间）"""
+    return [
+        f"{action['action']} {json.dumps(action['params'], ensure_ascii=False, sort_keys=True)}"
+        for action in actions
+    ]
+
+
+def diff_actions(baseline: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> List[str]:
+    """
+    对比两次回放产生的调用
+    
+    Returns:
+        unified diff 文本行，无差异时为空列表
+    """
+    return list(difflib.unified_diff(
+        canonical_actions(baseline), canonical_actions(current),
+        fromfile="baseline", tofile="current", lineterm=""
+    ))
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """输出吞吐量报告"""
+    events = report["events"]
+    handled = report["handled_wall_seconds"]
+    print(f"事件数: {events}，录制的验证问题: {report['challenges']} 个")
+    print(f"回放时长(虚拟/原始节奏): {report['replayed_seconds']:.1f}s")
+    print(f"事件处理耗时(真实): {handled:.3f}s, 吞吐量: {events / handled if handled else 0:.0f} 事件/秒")
+    print(f"总耗时(真实): {report['wall_seconds']:.3f}s")
+    print(f"协议端调用: {len(report['actions'])} 次")
+    for action, count in Counter(action["action"] for action in report["actions"]).most_common():
+        print(f"  {action}: {count}")
+    if report["errors"]:
+        print(f"处理失败的事件: {len(report['errors'])}")
+        for error in report["errors"][:10]:
+            print(f"  {error}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="回放 Authenticator 录制的事件")
+    parser.add_argument("capture", help="录制文件路径（.jsonl.gz 或 .jsonl）")
+    parser.add_argument("--config", help="插件配置文件（JSON），未提供的项使用默认值")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，默认按原始节奏")
+    parser.add_argument("--realtime", action="store_true", help="使用真实时间而不是虚拟时间")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟每次协议端调用的耗时（秒）")
+    parser.add_argument("--level", type=int, default=64, help="模拟的QQ等级")
+    parser.add_argument("--settle", type=float, default=600.0, help="最后一个事件后继续运行的时间（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子，用于为录制中没有验证问题的成员生成可复现的问题")
+    parser.add_argument("--output", help="将本次回放的协议端调用写入 JSONL 文件")
+    parser.add_argument("--baseline", help="与之对比的调用记录（--output 的输出）")
+    parser.add_argument("--metrics", action="store_true", help="输出插件运行指标")
+    parser.add_argument("--astrbot-root", default=os.getcwd(), help="AstrBot 根目录，默认为当前目录")
+    args = parser.parse_args(argv)
+    
+    sys.path.insert(0, args.astrbot_root)
+    plugin_main = load_plugin()
+    
+    config = default_config()
+    if args.config:
+        with open(args.config, encoding="utf-8") as file:
+            merge_config(config, json.load(file))
+    # 回放时不再录制；录制中的验证问题按原样发出，其余使用可复现的文本验证
+    config["EventCapture"]["EventCapture_Enable"] = False
+    config["SimpleReCAPTCHA"]["SimpleReCAPTCHA_ChallengeConfig"]["ChallengeConfig_Type"] = "Text"
+    random.seed(args.seed)
+    
+    records = read_capture(args.capture)
+    coroutine = replay(plugin_main, config, records, max(args.speed, 1e-6), args.latency, args.level, args.settle)
+    if args.realtime:
+        report = asyncio.run(coroutine)
+    else:
+        with virtual_time(VirtualClock()) as loop:
+            report = loop.run_until_complete(coroutine)
+    
+    print_report(report)
+    if args.metrics:
+        print(report["metrics"])
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            for action in report["actions"]:
+                file.write(json.dumps(action, ensure_ascii=False) + "\n")
+    
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = [json.loads(line) for line in file if line.strip()]
+        diff = diff_actions(baseline, report["actions"])
+        if diff:
+            print("\n".join(diff))
+            print(f"与基线存在差异: {sum(1 for line in diff if line[:1] in '+-' and line[:3] not in ('+++', '---'))} 行")
+            return 1
+        print("与基线一致。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+审核规则流水线模块
+按声明顺序决定结果，按执行成本安排求值顺序
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from .metrics import metrics
+
+
+class ReviewDecision:
+    """审核结果"""
+    
+    __slots__ = ("approve", "reason", "label", "delayed")
+    
+    def __init__(self, approve: bool, reason: str = "", label: str = "", delayed: bool = True) -> None:
+        """
+        初始化审核结果
+        
+        Args:
+            approve: 是否同意请求
+            reason: 拒绝理由
+            label: 触发该结果的依据，用于日志
+            delayed: 执行前是否需要等待配置的延迟时间
+        """
+        self.approve = approve
+        self.reason = reason
+        self.label = label
+        self.delayed = delayed
+    
+    def with_label(self, label: str) -> "ReviewDecision":
+        """复制该结果并替换日志依据"""
+        return ReviewDecision(self.approve, self.reason, label, self.delayed)
+
+
+class ReviewContext:
+    """单个加群请求的审核上下文"""
+    
+    __slots__ = ("event", "user_id", "group_id", "comment", "flag", "raid_mode", "level_cache")
+    
+    def __init__(self, event: Any, user_id: str, group_id: str, comment: str,
+                 flag: str, raid_mode: bool = False,
+                 level_cache: Optional[Dict[str, Any]] = None) -> None:
+        self.event = event
+        self.user_id = user_id
+        self.group_id = group_id
+        self.comment = comment
+        self.flag = flag
+        self.raid_mode = raid_mode
+        # 批量审核时在同一批请求间共享的等级查询任务：用户ID -> Task
+        self.level_cache = level_cache
+
+
+RuleCheck = Callable[[ReviewContext], Union[Optional[ReviewDecision], Awaitable[Optional[ReviewDecision]]]]
+
+
+class ReviewRule:
+    """审核规则"""
+    
+    # 执行成本：本地规则只做内存计算，远程规则需要调用平台接口
+    LOCAL = 0
+    REMOTE = 1
+    
+    def __init__(self, name: str, cost: int, check: RuleCheck, outcome: ReviewDecision) -> None:
+        """
+        初始化审核规则
+        
+        Args:
+            name: 规则名称，用于统计耗时
+            cost: 执行成本（LOCAL 或 REMOTE），远程规则的 check 须为协程函数
+            check: 规则判断函数，命中时返回审核结果，否则返回 None
+            outcome: 规则命中时可能产生的结果，用于判断是否可以跳过该规则
+        """
+        self.name = name
+        self.cost = cost
+        self.check = check
+        self.outcome = outcome
+        self.order = 0
+
+
+class RulePipeline:
+    """
+    审核规则流水线
+    
+    结果始终由按声明顺序第一个命中的规则决定，但求值时先执行低成本规则。
+    若某个高成本规则的结果不会改变最终结论（更靠前的规则已命中，或其结果与
+    后续已命中规则相同），则直接跳过，不产生远程调用。
+    """
+    
+    def __init__(self, rules: List[ReviewRule]) -> None:
+        """
+        初始化审核规则流水线
+        
+        Args:
+            rules: 按优先级（声明顺序）排列的规则
+        """
+        for order, rule in enumerate(rules):
+            rule.order = order
+        self.rules = rules
+        self._by_cost = sorted(rules, key=lambda rule: (rule.cost, rule.order))
+    
+    async def evaluate(self, ctx: ReviewContext,
+                       same_outcome: Callable[[ReviewDecision, ReviewDecision], bool]) -> Optional[ReviewDecision]:
+        """
+        对请求求值
+        
+        Args:
+            ctx: 审核上下文
+            same_outcome: 判断两个结果是否等价的函数
+        
+        Returns:
+            最终审核结果，所有规则均未命中时返回 None
+        """
+        fired: Dict[int, ReviewDecision] = {}
+        for rule in self._by_cost:
+            if fired and min(fired) < rule.order:
+                continue  # 更靠前的规则已命中，该规则不会影响结果
+            
+            if rule.cost > ReviewRule.LOCAL:
+                later = [order for order in fired if order > rule.order]
+                if later and same_outcome(fired[min(later)], rule.outcome):
+                    metrics.incr(f"review.rule.{rule.name}.skipped")
+                    continue
+            
+            start = time.perf_counter()
+            if rule.cost > ReviewRule.LOCAL:
+                decision = await rule.check(ctx)
+            else:
+                decision = rule.check(ctx)
+            metrics.observe(f"review.rule.{rule.name}", time.perf_counter() - start)
+            
+            if decision is not None:
+                fired[rule.order] = decision
+        
+        return fired[min(fired)] if fired else None
@@ -0,0 +1,58 @@
+"""
+滑动窗口计数模块
+使用固定大小的环形缓冲区统计最近一段时间内的事件数量
+"""
+import time
+from typing import Optional
+
+
+class SlidingWindowCounter:
+    """固定内存的滑动窗口计数器"""
+    
+    __slots__ = ("window_seconds", "_size", "_span", "_counts", "_slots")
+    
+    def __init__(self, window_seconds: float, buckets: int = 12) -> None:
+        """
+        初始化滑动窗口计数器
+        
+        Args:
+            window_seconds: 窗口长度（秒）
+            buckets: 环形缓冲区的桶数量，决定统计精度
+        """
+        self.window_seconds = window_seconds
+        self._size = max(1, buckets)
+        self._span = max(window_seconds, 1e-3) / self._size
+        self._counts = [0] * self._size
+        self._slots = [-1] * self._size
+    
+    def add(self, now: Optional[float] = None, value: int = 1) -> None:
+        """
+        记录事件
+        
+        Args:
+            now: 当前时间（单调时钟），为空时自动获取
+            value: 事件数量
+        """
+        if now is None:
+            now = time.monotonic()
+        slot = int(now // self._span)
+        index = slot % self._size
+        if self._slots[index] != slot:
+            self._slots[index] = slot
+            self._counts[index] = 0
+        self._counts[index] += value
+    
+    def count(self, now: Optional[float] = None) -> int:
+        """
+        获取窗口内的事件总数
+        
+        Args:
+            now: 当前时间（单调时钟），为空时自动获取
+            
+        Returns:
+            窗口内的事件数量
+        """
+        if now is None:
+            now = time.monotonic()
+        oldest = int(now // self._span) - self._size + 1
+        return sum(count for count, slot in zip(self._counts, self._slots) if slot >= oldest)
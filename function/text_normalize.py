@@ -0,0 +1,83 @@
+"""
+文本规范化模块
+在匹配前统一全角/半角、兼容字符、大小写与异体字，并去除不可见字符
+"""
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from astrbot.api import logger
+
+from .metrics import metrics
+
+# 常见的不可见字符：零宽字符、方向控制符、软连字符等
+INVISIBLE_CHARS = (
+    "\u00ad\u034f\u061c\u115f\u1160\u17b4\u17b5\u180e"
+    "\u200b\u200c\u200d\u200e\u200f\u202a\u202b\u202c\u202d\u202e"
+    "\u2060\u2061\u2062\u2063\u2064\u2066\u2067\u2068\u2069"
+    "\u206a\u206b\u206c\u206d\u206e\u206f\u3164"
+    "\ufe00\ufe01\ufe02\ufe03\ufe04\ufe05\ufe06\ufe07"
+    "\ufe08\ufe09\ufe0a\ufe0b\ufe0c\ufe0d\ufe0e\ufe0f"
+    "\ufeff\uffa0"
+)
+
+
+class TextNormalizer:
+    """
+    文本规范化器
+    
+    处理顺序：去除不可见字符 -> NFKC（全角转半角、兼容字符展开） -> 大小写折叠 -> 异体字替换。
+    关键词在编译时规范化一次，验证信息与回答通过 LRU 缓存规范化。
+    """
+    
+    def __init__(self, config: Dict[str, Any]) -> None:
+        """
+        初始化文本规范化器
+        
+        Args:
+            config: 插件配置
+        """
+        normalization_config = config["TextNormalization"]
+        self._table = self._build_table(normalization_config["TextNormalization_VariantMap"])
+        self.normalize = lru_cache(maxsize=max(1, normalization_config["TextNormalization_CacheSize"]))(self._normalize)
+    
+    @staticmethod
+    def _build_table(variant_map: List[str]) -> Dict[int, Any]:
+        """
+        构建字符替换表
+        
+        Args:
+            variant_map: 异体字映射，每项格式为“源字符=目标文本”
+        
+        Returns:
+            可用于 str.translate 的替换表
+        """
+        table: Dict[int, Any] = {ord(char): None for char in INVISIBLE_CHARS}
+        for entry in variant_map:
+            source, sep, target = entry.partition("=")
+            # 源字符同样经过 NFKC 与大小写折叠，保证与规范化后的文本一致
+            source = unicodedata.normalize("NFKC", source.strip()).casefold()
+            if not sep or len(source) != 1:
+                logger.warning(f"[Authenticator] 异体字映射 '{entry}' 格式错误，应为单个源字符=目标文本，已忽略。")
+                continue
+            table[ord(source)] = unicodedata.normalize("NFKC", target.strip()).casefold()
+        return table
+    
+    def _normalize(self, text: str) -> str:
+        """规范化文本（未缓存）"""
+        text = text.translate(self._table)
+        text = unicodedata.normalize("NFKC", text).casefold()
+        # NFKC 可能产生新的可替换字符（如全角异体字），再替换一次
+        return text.translate(self._table)
+    
+    def refresh(self) -> None:
+        """更新规范化缓存的命中率与容量指标"""
+        info = self.normalize.cache_info()
+        lookups = info.hits + info.misses
+        metrics.set_gauge("normalize.cache.size", info.currsize)
+        if lookups:
+            metrics.set_gauge("normalize.cache.hit_rate", info.hits / lookups)
+    
+    def clear(self) -> None:
+        """清空规范化缓存"""
+        self.normalize.cache_clear()
@@ -1,3 +1,4 @@
+import asyncio
 from typing import Dict, Any
 
 from astrbot.api import logger
@@ -7,17 +8,16 @@ from astrbot.api.star import Context, Star
 from .automaticReview import AppReview
 from .simpleReCAPTCHA import ReCAPTCHA
 from .ban import BanManager
-
-def require_aiocqhttp_platform(func):
-    """检查平台是否为 aiocqhttp"""
-    async def wrapper(self, event: AstrMessageEvent, *args, **kwargs):
-        # 检查平台是否为 aiocqhttp
-        if event.get_platform_name() != "aiocqhttp":
-            logger.debug(f"[Authenticator] 检测到非 aiocqhttp 平台({event.get_platform_name()})，跳过执行。")
-            return
-        # 如果是 aiocqhttp 平台，则执行原函数
-        return await func(self, event, *args, **kwargs)
-    return wrapper
+from .raidDetector import RaidDetector
+from .reviewQueue import ReviewQueue
+from .function.metrics import metrics
+from .function.dedup_cache import DedupCache
+from .function.api_guard import ApiGuard
+from .function.admission import AdmissionController
+from .function.text_normalize import TextNormalizer
+from .function.event_capture import EventCapture
+from .function.memory_report import MemoryInspector
+from .function.platform_adapter import PlatformRegistry
 
 # 主类定义
 class AuthenticatorPlugin(Star):
@@ -26,9 +26,25 @@ class AuthenticatorPlugin(Star):
         self.context = context
         
         # 初始化模块 - 传递完整的配置对象
-        self.recaptcha = ReCAPTCHA(config)
-        self.appreview = AppReview(config)
-        self.ban_manager = BanManager(config)
+        self.api_guard = ApiGuard(config)
+        self.platforms = PlatformRegistry(self.api_guard)
+        self.normalizer = TextNormalizer(config)
+        self.event_capture = EventCapture(config)
+        self.recaptcha = ReCAPTCHA(config, self.api_guard, self.normalizer, self.platforms, self.event_capture)
+        self.ban_manager = BanManager(config, self.api_guard, self.platforms)
+        self.appreview = AppReview(config, self.ban_manager, self.api_guard, self.normalizer, self.platforms)
+        self.review_queue = ReviewQueue(config, self.appreview)
+        self.raid_detector = RaidDetector(config)
+        self.admission = AdmissionController(config)
+        self.memory_inspector = MemoryInspector()
+        
+        # 初始化重复事件去重缓存
+        dedup_config = config["Deduplication"]
+        self.dedup_enabled = dedup_config["Deduplication_Enable"]
+        self.dedup_cache = DedupCache(
+            dedup_config["Deduplication_MaxEntries"],
+            dedup_config["Deduplication_TTLSeconds"]
+        )
         
         self._apply_monkey_patch()
         
@@ -52,23 +68,43 @@ class AuthenticatorPlugin(Star):
         except Exception as e:
             logger.warning(f"应用monkey patch失败: {e}")
 
-    @require_aiocqhttp_platform
     @filter.event_message_type(filter.EventMessageType.ALL)
     async def handle_event(self, event: AstrMessageEvent):
         """处理所有事件"""
+        # 每个机器人实例只检查一次平台，不受支持的平台直接跳过
+        if self.platforms.for_event(event) is None:
+            return
+        
         raw = event.message_obj.raw_message
         post_type = raw.get("post_type")
+        
+        # 录制原始事件（如已启用），供离线回放使用
+        self.event_capture.record(event, raw)
+        
+        # 重连后 OneBot 实现可能重复投递同一事件，重复的事件直接丢弃
+        if self.dedup_enabled and self._is_duplicate_event(raw, post_type):
+            return
 
         # 处理群聊申请事件（加群请求需要特殊处理，不能忽略）
         if post_type == "request" and raw.get("request_type") == "group" and raw.get("sub_type") == "add":
-            # 先检查黑名单
-            if await self.ban_manager.process_group_join_request(event, raw):
-                return  # 如果在黑名单中并已处理，直接返回
+            raid_mode = self.raid_detector.record_request(raw.get("group_id"))
             
-            await self.appreview.process_group_join_request(event, raw)
+            # 加群申请为关键事件，始终放行
+            self.admission.try_acquire("review", AdmissionController.CRITICAL)
+            try:
+                # 黑名单检查与突袭模式自动拒绝均作为审核规则执行
+                if self.review_queue.is_enabled():
+                    await self.review_queue.submit(event, raw, raid_mode=raid_mode)
+                else:
+                    await self.appreview.process_group_join_request(event, raw, raid_mode=raid_mode)
+            finally:
+                self.admission.release("review")
             return
 
-        # 对于其他类型的事件，检查是否应该忽略黑名单用户的消息
+        # 黑名单用户在群内发言或入群时安排踢出（仅内存查询，始终执行）
+        self.ban_manager.reconcile_member(event, raw)
+        
+        # 对于其他类型的事件，检查是否应该忽略黑名单用户的消息（仅内存查询，始终执行）
         if await self.ban_manager.should_ignore_user_message(event):
             # 停止事件传播，阻止其他插件处理此消息
             event.stop_event()
@@ -76,20 +112,150 @@ class AuthenticatorPlugin(Star):
         
         # 处理群消息和通知事件
         if post_type == "notice":
-            if raw.get("notice_type") == "group_increase":
-                await self.recaptcha.process_new_member(event)
-            elif raw.get("notice_type") == "group_decrease":
-                await self.recaptcha.process_member_decrease(event)
+            # 成员变动通知为关键事件，始终放行
+            self.admission.try_acquire("recaptcha", AdmissionController.CRITICAL)
+            try:
+                if raw.get("notice_type") == "group_increase":
+                    raid_mode = self.raid_detector.record_join(raw.get("group_id"))
+                    await self.recaptcha.process_new_member(event, raid_mode=raid_mode)
+                elif raw.get("notice_type") == "group_decrease":
+                    await self.recaptcha.process_member_decrease(event)
+            finally:
+                self.admission.release("recaptcha")
         
         elif post_type == "message" and raw.get("message_type") == "group":
-            await self.recaptcha.process_verification_message(event)
+            # 负载过高时优先丢弃非待验证用户的消息与防抖时间内的重复回答
+            uid = str(event.get_sender_id())
+            if not self.recaptcha.is_pending(uid):
+                priority, reason = AdmissionController.LOW, "chatter"
+            else:
+                priority = self.admission.answer_priority(uid)
+                reason = "repeat_answer" if priority == AdmissionController.LOW else "answer"
+            
+            if not self.admission.try_acquire("recaptcha", priority, reason):
+                return
+            try:
+                await self.recaptcha.process_verification_message(event)
+            finally:
+                self.admission.release("recaptcha")
+
+    def _is_duplicate_event(self, raw: Dict[str, Any], post_type: str) -> bool:
+        """
+        检查加群请求与成员变动通知是否为重复投递
+        
+        Args:
+            raw: 原始事件数据
+            post_type: 事件类型
+            
+        Returns:
+            是否为重复事件
+        """
+        if post_type == "request" and raw.get("flag"):
+            key = ("request", raw.get("flag"))
+        elif post_type == "notice" and raw.get("notice_type") in ("group_increase", "group_decrease"):
+            key = (raw.get("group_id"), raw.get("user_id"), raw.get("notice_type"), raw.get("time"))
+        else:
+            return False
+        
+        if self.dedup_cache.seen(key):
+            metrics.incr(f"dedup.suppressed.{post_type}")
+            logger.debug(f"[Authenticator] 忽略重复投递的事件: {key}")
+            return True
+        return False
+
+    @filter.command("authstats")
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    async def show_stats(self, event: AstrMessageEvent):
+        """查看插件运行指标"""
+        # 先刷新突袭模式与熔断器状态，保证指标为最新
+        self.raid_detector.refresh()
+        self.api_guard.refresh()
+        self.normalizer.refresh()
+        yield event.plain_result(metrics.render())
+
+    @filter.command("authmem")
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    async def show_memory(self, event: AstrMessageEvent, action: str = ""):
+        """查看插件持有的数据结构与内存占用，trace 对比内存分配快照，stop 停止跟踪"""
+        if action == "trace":
+            yield event.plain_result(self.memory_inspector.snapshot_diff())
+        elif action == "stop":
+            yield event.plain_result(self.memory_inspector.stop())
+        else:
+            yield event.plain_result(self.memory_inspector.render(self._memory_components()))
+
+    @filter.command("authban")
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    async def manage_ban_list(self, event: AstrMessageEvent, action: str = "", path: str = "", fmt: str = ""):
+        """批量导入/移除/导出黑名单：/authban import|remove|export 文件路径 [text|csv|json]"""
+        operations = {
+            "import": (self.ban_manager.import_file, "已从 {path} 导入 {count} 个新的黑名单用户。"),
+            "remove": (self.ban_manager.remove_file, "已按 {path} 移除 {count} 个黑名单用户。"),
+            "export": (self.ban_manager.export_file, "已导出 {count} 个黑名单用户到 {path}。"),
+        }
+        if action not in operations or not path:
+            yield event.plain_result("用法: /authban import|remove|export 文件路径 [text|csv|json]")
+            return
+        
+        operation, message = operations[action]
+        try:
+            count = await operation(path, fmt or None)
+        except (OSError, ValueError) as e:
+            logger.error(f"[Authenticator] 黑名单{action}失败: {e}")
+            yield event.plain_result(f"操作失败: {e}")
+            return
+        yield event.plain_result(message.format(path=path, count=count) + f"当前黑名单共 {len(self.ban_manager.banned_users)} 个用户。")
+
+    def _memory_components(self) -> Dict[str, Any]:
+        """列出需要统计内存占用的模块"""
+        return {
+            "recaptcha": self.recaptcha,
+            "appreview": self.appreview,
+            "review_queue": self.review_queue,
+            "ban_manager": self.ban_manager,
+            "raid_detector": self.raid_detector,
+            "api_guard": self.api_guard,
+            "platforms": self.platforms,
+            "admission": self.admission,
+            "normalizer": self.normalizer,
+            "dedup_cache": self.dedup_cache,
+            "event_capture": self.event_capture,
+            "metrics": metrics,
+        }
 
     async def terminate(self):
         """插件被卸载/停用时调用"""
         # 清理所有待处理的验证任务
         self.recaptcha.cleanup()
         
+        # 停止批量审核队列
+        self.review_queue.cleanup()
+        
         # 停止黑名单自动踢出任务
         self.ban_manager.cleanup()
         
+        # 清空事件去重缓存
+        self.dedup_cache.clear()
+        
+        # 清理突袭检测状态
+        self.raid_detector.cleanup()
+        
+        # 清理熔断器状态
+        self.api_guard.cleanup()
+        
+        # 清空平台适配器缓存
+        self.platforms.cleanup()
+        
+        # 清理准入控制状态
+        self.admission.cleanup()
+        
+        # 清空文本规范化缓存
+        self.normalizer.clear()
+        
+        # 停止事件录制，等待已录制的事件写入文件
+        await asyncio.to_thread(self.event_capture.close)
+        
+        # 停止内存分配跟踪（如已开启）
+        self.memory_inspector.stop()
+        
         logger.debug("[Authenticator] 插件已停止。")
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+突袭检测模块 (RaidDetector)
+统计各群的入群通知与加群申请速率，在短时间内大量涌入时切换到突袭模式
+"""
+import time
+from typing import Dict, Any
+
+from astrbot.api import logger
+
+from .function.metrics import metrics
+from .function.sliding_window import SlidingWindowCounter
+
+
+class RaidDetector:
+    """入群突袭检测器"""
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        初始化突袭检测模块
+        
+        Args:
+            config: 插件配置
+        """
+        self._load_config(config)
+        self._join_counters: Dict[str, SlidingWindowCounter] = {}
+        self._request_counters: Dict[str, SlidingWindowCounter] = {}
+        self._raid_since: Dict[str, float] = {}  # 群号 -> 进入突袭模式的时间
+        self._last_hot: Dict[str, float] = {}  # 群号 -> 最近一次超过阈值的时间
+    
+    def _load_config(self, config: Dict[str, Any]):
+        """加载突袭检测相关配置"""
+        raid_config = config["RaidDetection"]
+        
+        self.enabled = raid_config["RaidDetection_Enable"]
+        self.window_seconds = raid_config["RaidDetection_WindowSeconds"]
+        self.join_threshold = raid_config["RaidDetection_JoinThreshold"]
+        self.request_threshold = raid_config["RaidDetection_RequestThreshold"]
+        self.cooldown_seconds = raid_config["RaidDetection_CooldownSeconds"]
+        
+        self.whitelist_groups = config["WhitelistGroups"]
+    
+    def _counter(self, counters: Dict[str, SlidingWindowCounter], group_id: str) -> SlidingWindowCounter:
+        """获取（或创建）指定群的计数器"""
+        counter = counters.get(group_id)
+        if counter is None:
+            counter = counters[group_id] = SlidingWindowCounter(self.window_seconds)
+        return counter
+    
+    def _is_tracked(self, group_id: str) -> bool:
+        """检查该群是否需要进行突袭检测"""
+        if not self.enabled:
+            return False
+        return not self.whitelist_groups or group_id in self.whitelist_groups
+    
+    def record_join(self, group_id: Any) -> bool:
+        """
+        记录一次入群通知
+        
+        Args:
+            group_id: 群ID
+        
+        Returns:
+            该群当前是否处于突袭模式
+        """
+        group_id = str(group_id)
+        if not self._is_tracked(group_id):
+            return False
+        now = time.monotonic()
+        self._counter(self._join_counters, group_id).add(now)
+        return self._evaluate(group_id, now)
+    
+    def record_request(self, group_id: Any) -> bool:
+        """
+        记录一次加群申请
+        
+        Args:
+            group_id: 群ID
+        
+        Returns:
+            该群当前是否处于突袭模式
+        """
+        group_id = str(group_id)
+        if not self._is_tracked(group_id):
+            return False
+        now = time.monotonic()
+        self._counter(self._request_counters, group_id).add(now)
+        return self._evaluate(group_id, now)
+    
+    def is_raid(self, group_id: Any) -> bool:
+        """
+        检查群当前是否处于突袭模式
+        
+        Args:
+            group_id: 群ID
+        """
+        group_id = str(group_id)
+        if group_id not in self._raid_since:
+            return False
+        return self._evaluate(group_id, time.monotonic())
+    
+    def refresh(self):
+        """重新评估所有处于突袭模式的群，使速率回落的群及时退出"""
+        now = time.monotonic()
+        for group_id in list(self._raid_since):
+            self._evaluate(group_id, now)
+    
+    def _is_hot(self, group_id: str, now: float) -> bool:
+        """检查群的入群速率是否超过阈值"""
+        if self.join_threshold > 0:
+            counter = self._join_counters.get(group_id)
+            if counter and counter.count(now) >= self.join_threshold:
+                return True
+        if self.request_threshold > 0:
+            counter = self._request_counters.get(group_id)
+            if counter and counter.count(now) >= self.request_threshold:
+                return True
+        return False
+    
+    def _evaluate(self, group_id: str, now: float) -> bool:
+        """根据当前速率更新群的突袭状态"""
+        if self._is_hot(group_id, now):
+            self._last_hot[group_id] = now
+            if group_id not in self._raid_since:
+                self._raid_since[group_id] = now
+                metrics.incr("raid.enter")
+                metrics.set_gauge("raid.active_groups", len(self._raid_since))
+                logger.warning(f"[Authenticator] 群 {group_id} 入群速率超过阈值，已进入突袭模式。")
+            return True
+        
+        since = self._raid_since.get(group_id)
+        if since is None:
+            return False
+        
+        if now - self._last_hot.get(group_id, since) < self.cooldown_seconds:
+            return True
+        
+        # 速率已回落并超过冷却时间，退出突袭模式
+        self._raid_since.pop(group_id, None)
+        self._last_hot.pop(group_id, None)
+        metrics.incr("raid.exit")
+        metrics.observe("raid.duration", now - since)
+        metrics.set_gauge("raid.active_groups", len(self._raid_since))
+        logger.info(f"[Authenticator] 群 {group_id} 入群速率已回落，退出突袭模式（持续 {now - since:.0f} 秒）。")
+        return False
+    
+    def active_groups(self) -> Dict[str, float]:
+        """获取当前处于突袭模式的群及其持续时间（秒）"""
+        now = time.monotonic()
+        return {group_id: now - since for group_id, since in self._raid_since.items()}
+    
+    def cleanup(self):
+        """清理资源"""
+        self._join_counters.clear()
+        self._request_counters.clear()
+        self._raid_since.clear()
+        self._last_hot.clear()
+        metrics.set_gauge("raid.active_groups", 0)
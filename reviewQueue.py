@@ -0,0 +1,213 @@
+"""
+批量审核模块 (ReviewQueue)
+将短时间内到达的加群请求合并为一批，并发求值并通过有限的工作协程执行审核操作
+"""
+import asyncio
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from astrbot.api import logger
+from astrbot.api.event import AstrMessageEvent
+
+from .automaticReview import AppReview
+from .function.metrics import metrics
+from .function.rule_pipeline import ReviewDecision
+
+
+class ReviewQueue:
+    """加群请求批量审核队列"""
+    
+    def __init__(self, config: Dict[str, Any], appreview: AppReview):
+        """
+        初始化批量审核模块
+        
+        Args:
+            config: 插件配置
+            appreview: 加群审核处理器
+        """
+        self.appreview = appreview
+        self._load_config(config)
+        # 当前窗口内收集的请求：(群号, 用户ID) -> (事件, 请求数据, 是否突袭模式, 到达时间)
+        self._window: Dict[Tuple[str, str], Tuple[AstrMessageEvent, Dict[str, Any], bool, float]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._actions: Optional[asyncio.Queue] = None
+        # 所有批次共用的等级查询并发限制，窗口较短时多个批次可能同时在求值
+        self._lookup_semaphore: Optional[asyncio.Semaphore] = None
+        self._workers: List[asyncio.Task] = []
+        # 尚未到期的审核操作的计时器，到期后才放入执行队列
+        self._timers: Set[asyncio.TimerHandle] = set()
+    
+    def _load_config(self, config: Dict[str, Any]):
+        """加载批量审核相关配置"""
+        batch_config = config["AutomaticReview"]["AutomaticReview_BatchConfig"]
+        
+        self.enabled = batch_config["BatchConfig_Enable"]
+        self.window_seconds = batch_config["BatchConfig_WindowMs"] / 1000
+        self.lookup_concurrency = max(1, batch_config["BatchConfig_LookupConcurrency"])
+        self.action_workers = max(1, batch_config["BatchConfig_ActionWorkers"])
+    
+    def is_enabled(self) -> bool:
+        """检查批量审核功能是否启用"""
+        return self.enabled
+    
+    async def submit(self, event: AstrMessageEvent, request_data: Dict[str, Any],
+                     raid_mode: bool = False) -> None:
+        """
+        提交加群请求，请求会在当前窗口结束后统一处理
+        
+        Args:
+            event: 消息事件
+            request_data: 请求数据
+            raid_mode: 该群是否处于突袭模式
+        """
+        user_id = str(request_data.get("user_id", ""))
+        group_id = str(request_data.get("group_id", ""))
+        
+        # 检查白名单，如果配置了白名单且当前群不在白名单中，则跳过处理
+        if self.appreview.whitelist_groups and group_id not in self.appreview.whitelist_groups:
+            logger.debug(f"[Authenticator] 群 {group_id} 不在白名单内，跳过加群请求处理。")
+            return
+        
+        logger.info(f"[Authenticator] 收到加群请求: 用户ID={user_id}, 群ID={group_id}, 验证信息={request_data.get('comment', '')}。")
+        
+        key = (group_id, user_id)
+        if key in self._window:
+            # 同一用户在窗口内重复申请同一群，仅处理最新的一次
+            metrics.incr("review.batch.deduplicated")
+            logger.debug(f"[Authenticator] 用户 {user_id} 在窗口内重复申请加入群 {group_id}，仅处理最新的申请。")
+        self._window[key] = (event, request_data, raid_mode, time.monotonic())
+        
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+    
+    async def _flush_after_window(self):
+        """等待窗口结束后处理本窗口内的所有请求"""
+        try:
+            await asyncio.sleep(self.window_seconds)
+        finally:
+            self._flush_task = None
+        
+        batch, self._window = self._window, {}
+        task = asyncio.current_task()
+        self._flush_tasks.add(task)
+        try:
+            await self._process_batch(list(batch.values()))
+        except Exception as e:
+            logger.error(f"[Authenticator] 批量审核加群请求失败: {e}")
+        finally:
+            self._flush_tasks.discard(task)
+    
+    async def _process_batch(self, batch: List[Tuple[AstrMessageEvent, Dict[str, Any], bool, float]]):
+        """
+        并发求值一批请求，并将审核操作交给工作协程执行
+        
+        Args:
+            batch: 本窗口内去重后的请求
+        """
+        if not batch:
+            return
+        
+        start = time.perf_counter()
+        if self._lookup_semaphore is None:
+            self._lookup_semaphore = asyncio.Semaphore(self.lookup_concurrency)
+        semaphore = self._lookup_semaphore
+        level_cache: Dict[str, asyncio.Task] = {}
+        
+        async def evaluate(item) -> Optional[ReviewDecision]:
+            event, request_data, raid_mode, _ = item
+            async with semaphore:
+                return await self.appreview.evaluate_request(event, request_data, raid_mode, level_cache)
+        
+        decisions = await asyncio.gather(*(evaluate(item) for item in batch), return_exceptions=True)
+        metrics.incr("review.batch.batches")
+        metrics.incr("review.batch.requests", len(batch))
+        metrics.observe("review.batch.evaluate", time.perf_counter() - start)
+        
+        self._ensure_workers()
+        for item, decision in zip(batch, decisions):
+            event, request_data, _, received = item
+            if isinstance(decision, BaseException):
+                logger.error(f"[Authenticator] 审核用户 {request_data.get('user_id')} 的加群请求失败: {decision}")
+                continue
+            if decision is None:
+                await self.appreview.apply_decision(event, request_data, None)
+                continue
+            
+            due = received
+            delay_seconds = self.appreview.profiles.get(request_data.get("group_id")).delay_seconds
+            if decision.delayed and delay_seconds > 0:
+                due += delay_seconds
+                action = "同意" if decision.approve else "拒绝"
+                logger.info(f"[Authenticator] 将在 {delay_seconds} 秒后根据{decision.label}{action}用户 {request_data.get('user_id')} 加入群 {request_data.get('group_id')} 的请求。")
+            self._schedule(due, (event, request_data, decision))
+    
+    def _schedule(self, due: float, item: Tuple[AstrMessageEvent, Dict[str, Any], ReviewDecision]):
+        """
+        在到期时将审核操作放入执行队列
+        
+        工作协程只执行已到期的操作，立即执行的拒绝不会排在尚未到期的延迟操作之后。
+        
+        Args:
+            due: 到期时间（time.monotonic）
+            item: (事件, 请求数据, 审核结果)
+        """
+        delay = due - time.monotonic()
+        if delay <= 0:
+            self._actions.put_nowait(item)
+            return
+        
+        def enqueue():
+            self._timers.discard(handle)
+            if self._actions is not None:
+                self._actions.put_nowait(item)
+        
+        handle = asyncio.get_running_loop().call_later(delay, enqueue)
+        self._timers.add(handle)
+    
+    def _ensure_workers(self):
+        """按需启动执行审核操作的工作协程"""
+        if self._actions is None:
+            self._actions = asyncio.Queue()
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.action_workers:
+            self._workers.append(asyncio.create_task(self._action_worker()))
+    
+    async def _action_worker(self):
+        """从队列中取出已到期的审核结果，执行同意/拒绝操作"""
+        queue = self._actions
+        while True:
+            event, request_data, decision = await queue.get()
+            try:
+                await self.appreview.apply_decision(event, request_data, decision, wait=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Authenticator] 执行加群请求审核操作失败: {e}")
+            finally:
+                queue.task_done()
+    
+    async def drain(self):
+        """等待当前所有窗口与已排队的审核操作处理完毕"""
+        while self._flush_task is not None or self._flush_tasks or self._timers:
+            await asyncio.sleep(self.window_seconds or 0.01)
+        if self._actions is not None:
+            await self._actions.join()
+    
+    def cleanup(self):
+        """清理资源"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        for task in list(self._flush_tasks):
+            task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        for handle in self._timers:
+            handle.cancel()
+        self._timers.clear()
+        self._flush_task = None
+        self._flush_tasks.clear()
+        self._workers.clear()
+        self._window.clear()
+        self._actions = None
+        self._lookup_semaphore = None
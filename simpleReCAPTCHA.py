@@ -3,60 +3,145 @@
 处理新成员入群验证功能
 """
 import asyncio
-import random
 import re
-from typing import Dict, Any, Tuple, Optional
+from typing import Dict, Any, List, Tuple, Optional
 
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
 
 from .function.utils import safe_format
+from .function.captcha_render import generate_math_problem
+from .function.challenge import Challenge, create_challenge_generator
+from .function.api_guard import UNAVAILABLE_ERRORS, ApiGuard
+from .function.event_capture import EventCapture
+from .function.group_profiles import VERIFICATION_FIELDS, ProfileIndex, parse_group_profiles
+from .function.metrics import metrics
+from .function.platform_adapter import PlatformRegistry
+from .function.text_normalize import TextNormalizer
+
+# 合并验证消息中最多包含的图片验证码数量，超出时分为多条发送，避免单条消息超出协议端的大小限制
+BATCH_PROMPT_IMAGE_LIMIT = 5
+
+
+class VerificationProfile:
+    """单个群的入群验证配置"""
+    
+    __slots__ = ("verification_timeout", "kick_delay", "new_member_prompt", "welcome_message",
+                 "wrong_answer_prompt", "kick_countdown_warning_time", "countdown_warning_prompt",
+                 "failure_message", "kick_message")
+    
+    def __init__(self, settings: Dict[str, Any]) -> None:
+        """
+        初始化验证配置
+        
+        Args:
+            settings: 合并后的配置，键见 VERIFICATION_FIELDS
+        """
+        self.verification_timeout: int = settings["VerificationTimeout"]
+        self.kick_delay: int = settings["KickDelay"]
+        self.new_member_prompt: str = settings["JoinMessage"]
+        self.welcome_message: str = settings["SuccessMessage"]
+        self.wrong_answer_prompt: str = settings["WrongMessage"]
+        self.kick_countdown_warning_time: int = settings["CountdownWarningTime"]
+        self.countdown_warning_prompt: str = settings["CountdownWarningMessage"]
+        self.failure_message: str = settings["FailureMessage"]
+        self.kick_message: str = settings["KickMessage"]
 
 
 class ReCAPTCHA:
     """验证码验证处理器"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], api_guard: Optional[ApiGuard] = None,
+                 normalizer: Optional[TextNormalizer] = None, platforms: Optional[PlatformRegistry] = None,
+                 capture: Optional[EventCapture] = None):
         """
         初始化验证码验证模块
         
         Args:
             config: 插件配置
+            api_guard: 协议端调用保护器，为空时自行创建
+            normalizer: 文本规范化器，为空时自行创建
+            platforms: 平台适配器缓存，为空时自行创建
+            capture: 事件录制器，用于录制发出的验证问题，为空时不录制
         """
         self._load_config(config)
+        self.api_guard = api_guard or ApiGuard(config)
+        self.normalizer = normalizer or TextNormalizer(config)
+        self.platforms = platforms or PlatformRegistry(self.api_guard)
+        self.capture = capture
         self.pending: Dict[str, Dict[str, Any]] = {}
+        # 协议端不可用时延后执行的踢出：(群号, 用户ID) -> (协议端适配器, 群ID, 昵称)
+        self._deferred_kicks: Dict[Tuple[str, str], Tuple[Any, int, str]] = {}
+        self._kick_retry_task: Optional[asyncio.Task] = None
+        # 尽早开始预渲染验证问题（如使用图片验证）
+        self.challenge_generator.start()
+        # 突袭模式下待合并发送的验证消息：群号 -> [(用户ID, 问题)]
+        self._prompt_batches: Dict[int, List[Tuple[str, str]]] = {}
+        self._batch_tasks: Dict[int, asyncio.Task] = {}
+        # 短时间内集中超时、待合并处理的成员：群号 -> [(用户ID, 昵称, 待验证记录)]
+        self._expired_batches: Dict[int, List[Tuple[str, str, Dict[str, Any]]]] = {}
+        self._expiry_tasks: Dict[int, asyncio.Task] = {}
     
     def _load_config(self, config: Dict[str, Any]):
         """加载验证码验证相关配置"""
         # 从配置结构中获取配置（直接获取，没有items层）
         recaptcha_config = config["SimpleReCAPTCHA"]
         
-        # 获取基础配置
-        self.verification_timeout = recaptcha_config["SimpleReCAPTCHA_VerificationTimeout"]
-        self.kick_delay = recaptcha_config["SimpleReCAPTCHA_KickDelay"]
+        # 获取验证问题类型配置
+        self.challenge_generator = create_challenge_generator(recaptcha_config["SimpleReCAPTCHA_ChallengeConfig"])
         
         # 获取消息配置
         message_config = recaptcha_config["SimpleReCAPTCHA_MessageConfig"]
-        self.new_member_prompt = message_config["MessageConfig_Join"]
-        self.welcome_message = message_config["MessageConfig_Success"]
-        self.wrong_answer_prompt = message_config["MessageConfig_Wrong"]
         
         # 获取倒计时警告配置
         countdown_config = message_config["MessageConfig_CountdownWarningConfig"]
-        self.kick_countdown_warning_time = countdown_config["CountdownWarningConfig_Time"]
-        self.countdown_warning_prompt = countdown_config["CountdownWarningConfig_Message"]
         
         # 获取失败配置
         failure_config = message_config["MessageConfig_FailureConfig"]
         self.disable_failure_message = not failure_config["FailureConfig_Enable"]
-        self.failure_message = failure_config["FailureConfig_Message"]
         
         # 获取踢出配置
         kick_config = message_config["MessageConfig_KickConfig"]
         self.disable_kick_message = not kick_config["KickConfig_Enable"]
-        self.kick_message = kick_config["KickConfig_Message"]
+        
+        # 获取超时合并处理配置
+        timeout_batch_config = recaptcha_config["SimpleReCAPTCHA_TimeoutBatchConfig"]
+        self.timeout_batch_enabled = timeout_batch_config["TimeoutBatchConfig_Enable"]
+        self.timeout_batch_window = timeout_batch_config["TimeoutBatchConfig_WindowSeconds"]
+        self.kick_concurrency = max(1, timeout_batch_config["TimeoutBatchConfig_KickConcurrency"])
+        
+        # 获取突袭模式下的合并验证消息配置
+        raid_config = config["RaidDetection"]
+        self.batch_interval = raid_config["RaidDetection_BatchInterval"]
+        self.batch_prompt = raid_config["RaidDetection_BatchMessage"]
         
         self.whitelist_groups = config["WhitelistGroups"]
+        
+        # 全局配置作为未单独配置的群的默认值，按群建立验证配置索引
+        base_settings = {
+            "VerificationTimeout": recaptcha_config["SimpleReCAPTCHA_VerificationTimeout"],
+            "KickDelay": recaptcha_config["SimpleReCAPTCHA_KickDelay"],
+            "JoinMessage": message_config["MessageConfig_Join"],
+            "SuccessMessage": message_config["MessageConfig_Success"],
+            "WrongMessage": message_config["MessageConfig_Wrong"],
+            "CountdownWarningTime": countdown_config["CountdownWarningConfig_Time"],
+            "CountdownWarningMessage": countdown_config["CountdownWarningConfig_Message"],
+            "FailureMessage": failure_config["FailureConfig_Message"],
+            "KickMessage": kick_config["KickConfig_Message"],
+        }
+        self.profiles: ProfileIndex[VerificationProfile] = ProfileIndex(
+            base_settings, parse_group_profiles(config, base_settings), VERIFICATION_FIELDS, VerificationProfile
+        )
+        metrics.set_gauge("profiles.verification.compiled", self.profiles.compiled_count)
+    
+    def is_pending(self, uid: str) -> bool:
+        """
+        检查用户是否正在等待验证
+        
+        Args:
+            uid: 用户ID
+        """
+        return uid in self.pending
     
     def generate_math_problem(self) -> Tuple[str, int]:
         """
@@ -65,105 +150,255 @@ class ReCAPTCHA:
         Returns:
             Tuple[问题描述, 正确答案]
         """
-        op_type = random.choice(['add', 'sub'])
-        if op_type == 'add':
-            num1 = random.randint(0, 100)
-            num2 = random.randint(0, 100 - num1)
-            answer = num1 + num2
-            question = f"{num1} + {num2} = ?"
-            return question, answer
-        else:
-            num1 = random.randint(1, 100)
-            num2 = random.randint(0, num1)
-            answer = num1 - num2
-            question = f"{num1} - {num2} = ?"
-            return question, answer
+        return generate_math_problem()
     
-    async def timeout_kick(self, bot, uid: str, gid: int, nickname: str):
+    async def timeout_kick(self, adapter, uid: str, gid: int, nickname: str):
         """
         处理超时、警告和踢出的协程
         
         Args:
-            bot: 机器人实例
+            adapter: 协议端适配器
             uid: 用户ID
             gid: 群ID
             nickname: 用户昵称
         """
-        # 检查是否为aiocqhttp平台
-        if bot.get_platform_name() != "aiocqhttp":
-            logger.debug(f"[Authenticator] 插件仅支持 aiocqhttp 平台执行踢出操作，当前平台: {bot.get_platform_name()}，跳过操作。")
-            return
-            
+        profile = self.profiles.get(gid)
         try:
-            wait_time = self.verification_timeout - self.kick_countdown_warning_time
-            if self.kick_countdown_warning_time > 0 and wait_time > 0:
+            wait_time = profile.verification_timeout - profile.kick_countdown_warning_time
+            if profile.kick_countdown_warning_time > 0 and wait_time > 0:
                 await asyncio.sleep(wait_time)
                 if uid not in self.pending: return
                 
                 at_user = f"[CQ:at,qq={uid}]"
                 warning_msg = safe_format(
-                    self.countdown_warning_prompt, 
+                    profile.countdown_warning_prompt, 
                     at_user=at_user, 
                     member_name=nickname
                 )
-                try:
-                    await bot.api.call_action("send_group_msg", group_id=gid, message=warning_msg)
-                except Exception as e:
-                    logger.warning(f"[Authenticator] 发送超时警告失败: {e}")
+                await self._send_group_msg(adapter, gid, warning_msg, "超时警告")
                 
-                await asyncio.sleep(self.kick_countdown_warning_time)
+                await asyncio.sleep(profile.kick_countdown_warning_time)
             else:
-                await asyncio.sleep(self.verification_timeout)
+                await asyncio.sleep(profile.verification_timeout)
 
             if uid not in self.pending: return
+            
+            if self.timeout_batch_enabled:
+                # 交由合并处理，待验证记录在踢出或验证通过后清理
+                self._queue_expired_member(adapter, uid, gid, nickname)
+                return
 
             # 发送验证超时提示语（如果未禁用）
             if not self.disable_failure_message:
                 at_user = f"[CQ:at,qq={uid}]"
                 failure_msg = safe_format(
-                    self.failure_message, 
+                    profile.failure_message, 
                     at_user=at_user, 
                     member_name=nickname, 
-                    countdown=self.kick_delay
+                    countdown=profile.kick_delay
                 )
-                await bot.api.call_action("send_group_msg", group_id=gid, message=failure_msg)
+                await self._send_group_msg(adapter, gid, failure_msg, "验证超时提示")
             
-            await asyncio.sleep(self.kick_delay)
+            await asyncio.sleep(profile.kick_delay)
 
             if uid not in self.pending: return
             
-            await bot.api.call_action("set_group_kick", group_id=gid, user_id=int(uid), reject_add_request=False)
-            logger.info(f"[Authenticator] 用户 {uid} ({nickname}) 验证超时，已从群 {gid} 踢出。")
+            if not await self._kick_member(adapter, gid, uid, nickname):
+                return
             
             # 发送最终踢出提示语（如果未禁用）
             if not self.disable_kick_message:
                 at_user = f"[CQ:at,qq={uid}]"
                 kick_msg = safe_format(
-                    self.kick_message, 
+                    profile.kick_message, 
                     at_user=at_user, 
                     member_name=nickname
                 )
-                await bot.api.call_action("send_group_msg", group_id=gid, message=kick_msg)
+                await self._send_group_msg(adapter, gid, kick_msg, "踢出提示")
 
         except asyncio.CancelledError:
             logger.info(f"[Authenticator] 踢出任务已取消 (用户 {uid})。")
         except Exception as e:
             logger.error(f"[Authenticator] 踢出流程发生错误 (用户 {uid}): {e}")
         finally:
-            self.pending.pop(uid, None)
+            # 仅清理本任务对应的记录，用户重新出题后的新记录不受影响；合并处理中的记录由合并任务清理
+            entry = self.pending.get(uid)
+            if entry is not None and entry.get("task") is asyncio.current_task() and not entry.get("expired"):
+                self.pending.pop(uid, None)
+    
+    def _queue_expired_member(self, adapter, uid: str, gid: int, nickname: str):
+        """
+        将验证超时的成员加入该群的合并处理队列
+        
+        Args:
+            adapter: 协议端适配器
+            uid: 用户ID
+            gid: 群ID
+            nickname: 用户昵称
+        """
+        entry = self.pending[uid]
+        entry["expired"] = True
+        self._expired_batches.setdefault(gid, []).append((uid, nickname, entry))
+        task = self._expiry_tasks.get(gid)
+        if task is None or task.done():
+            self._expiry_tasks[gid] = asyncio.create_task(self._process_expired_batch(adapter, gid))
+    
+    def _still_pending(self, members: List[Tuple[str, str, Dict[str, Any]]]) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """过滤出仍在等待验证（未通过验证、未离开、未重新出题）的成员"""
+        return [member for member in members if self.pending.get(member[0]) is member[2]]
+    
+    async def _process_expired_batch(self, adapter, gid: int):
+        """
+        合并处理一个群在窗口内超时的成员：发送一条超时提示，等待踢出延迟后
+        以有限并发踢出，最后发送一条汇总的踢出提示
+        
+        Args:
+            adapter: 协议端适配器
+            gid: 群ID
+        """
+        profile = self.profiles.get(gid)
+        members: List[Tuple[str, str, Dict[str, Any]]] = []
+        try:
+            await asyncio.sleep(self.timeout_batch_window)
+            self._expiry_tasks.pop(gid, None)
+            members = self._still_pending(self._expired_batches.pop(gid, []))
+            if not members:
+                return
+            metrics.incr("recaptcha.timeout_batch.batches")
+            metrics.incr("recaptcha.timeout_batch.members", len(members))
+            
+            # 发送一条@所有超时成员的验证超时提示（如果未禁用）
+            if not self.disable_failure_message:
+                failure_msg = safe_format(
+                    profile.failure_message,
+                    at_user=" ".join(f"[CQ:at,qq={uid}]" for uid, _, _ in members),
+                    member_name="、".join(nickname for _, nickname, _ in members),
+                    countdown=profile.kick_delay,
+                    count=len(members)
+                )
+                await self._send_group_msg(adapter, gid, failure_msg, "验证超时提示")
+            
+            await asyncio.sleep(profile.kick_delay)
+            
+            # 等待期间完成验证或离开的成员不再踢出
+            members = self._still_pending(members)
+            semaphore = asyncio.Semaphore(self.kick_concurrency)
+            
+            async def kick(member) -> bool:
+                uid, nickname, _ = member
+                async with semaphore:
+                    try:
+                        return await self._kick_member(adapter, gid, uid, nickname)
+                    except Exception as e:
+                        logger.error(f"[Authenticator] 踢出用户 {uid} 失败: {e}")
+                        return False
+            
+            results = await asyncio.gather(*(kick(member) for member in members))
+            kicked = [member for member, success in zip(members, results) if success]
+            logger.info(f"[Authenticator] 已合并处理群 {gid} 中 {len(members)} 名验证超时的成员，成功踢出 {len(kicked)} 名。")
+            
+            # 发送一条汇总的踢出提示（如果未禁用）
+            if kicked and not self.disable_kick_message:
+                kick_msg = safe_format(
+                    profile.kick_message,
+                    at_user=" ".join(f"[CQ:at,qq={uid}]" for uid, _, _ in kicked),
+                    member_name="、".join(nickname for _, nickname, _ in kicked),
+                    count=len(kicked)
+                )
+                await self._send_group_msg(adapter, gid, kick_msg, "踢出提示")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"[Authenticator] 合并处理群 {gid} 的验证超时成员时发生错误: {e}")
+        finally:
+            for uid, _, entry in members:
+                if self.pending.get(uid) is entry:
+                    self.pending.pop(uid, None)
+    
+    async def _send_group_msg(self, adapter, gid: int, message: str, description: str) -> bool:
+        """
+        发送群消息，失败时仅记录日志
+        
+        Args:
+            adapter: 协议端适配器
+            gid: 群ID
+            message: 消息内容
+            description: 消息用途，用于日志
+            
+        Returns:
+            是否发送成功
+        """
+        try:
+            await adapter.send_group_msg(gid, message)
+            return True
+        except Exception as e:
+            logger.warning(f"[Authenticator] 发送{description}失败 (群 {gid}): {type(e).__name__} {e}")
+            return False
     
-    async def process_new_member(self, event: AstrMessageEvent):
+    async def _kick_member(self, adapter, gid: int, uid: str, nickname: str) -> bool:
+        """
+        将验证超时的成员踢出群聊，协议端不可用时加入延后踢出队列
+        
+        Args:
+            adapter: 协议端适配器
+            gid: 群ID
+            uid: 用户ID
+            nickname: 用户昵称
+            
+        Returns:
+            是否已成功踢出
+        """
+        try:
+            await adapter.set_group_kick(gid, int(uid))
+        except UNAVAILABLE_ERRORS as e:
+            logger.warning(f"[Authenticator] 协议端暂不可用，踢出用户 {uid} 的操作已延后: {type(e).__name__} {e}")
+            self._defer_kick(adapter, gid, uid, nickname)
+            return False
+        logger.info(f"[Authenticator] 用户 {uid} ({nickname}) 验证超时，已从群 {gid} 踢出。")
+        return True
+    
+    def _defer_kick(self, adapter, gid: int, uid: str, nickname: str):
+        """
+        将踢出操作加入延后队列，待协议端恢复后重试
+        
+        Args:
+            adapter: 协议端适配器
+            gid: 群ID
+            uid: 用户ID
+            nickname: 用户昵称
+        """
+        self._deferred_kicks[(str(gid), uid)] = (adapter, gid, nickname)
+        metrics.set_gauge("recaptcha.deferred_kicks", len(self._deferred_kicks))
+        if self._kick_retry_task is None or self._kick_retry_task.done():
+            self._kick_retry_task = asyncio.create_task(self._retry_deferred_kicks())
+    
+    async def _retry_deferred_kicks(self):
+        """定期重试延后的踢出操作，直到队列清空"""
+        while self._deferred_kicks:
+            await asyncio.sleep(max(1, self.api_guard.reset_seconds))
+            for key, (adapter, gid, nickname) in list(self._deferred_kicks.items()):
+                if not adapter.is_available():
+                    continue
+                uid = key[1]
+                try:
+                    await adapter.set_group_kick(gid, int(uid))
+                except UNAVAILABLE_ERRORS:
+                    break  # 协议端仍不可用，等待下一轮
+                except Exception as e:
+                    logger.error(f"[Authenticator] 延后踢出用户 {uid} 失败: {e}")
+                else:
+                    logger.info(f"[Authenticator] 用户 {uid} ({nickname}) 验证超时，已延后从群 {gid} 踢出。")
+                self._deferred_kicks.pop(key, None)
+                metrics.set_gauge("recaptcha.deferred_kicks", len(self._deferred_kicks))
+    
+    async def process_new_member(self, event: AstrMessageEvent, raid_mode: bool = False):
         """
         处理新成员入群
         
         Args:
             event: 消息事件
+            raid_mode: 该群是否处于突袭模式，是则合并发送验证消息
         """
-        # 检查是否为aiocqhttp平台
-        if event.get_platform_name() != "aiocqhttp":
-            logger.debug(f"[Authenticator] 插件仅支持 aiocqhttp 平台处理新成员，当前平台: {event.get_platform_name()}，跳过处理。")
-            return
-            
         raw = event.message_obj.raw_message
         uid = str(raw.get("user_id"))
         gid = raw.get("group_id")
@@ -171,10 +406,10 @@ class ReCAPTCHA:
             logger.debug(f"[Authenticator] 群 {gid} 不在白名单内，跳过验证。")
             return
         
-        await self.start_verification_process(event, uid, gid, is_new_member=True)
+        await self.start_verification_process(event, uid, gid, is_new_member=True, batch=raid_mode)
     
     async def start_verification_process(self, event: AstrMessageEvent, uid: str, 
-                                       gid: int, is_new_member: bool):
+                                       gid: int, is_new_member: bool, batch: bool = False):
         """
         启动或重启验证流程
         
@@ -183,46 +418,143 @@ class ReCAPTCHA:
             uid: 用户ID
             gid: 群ID
             is_new_member: 是否是新成员
+            batch: 是否合并发送验证消息（突袭模式下使用，且不再逐个获取昵称）
         """
-        # 检查是否为aiocqhttp平台
-        if event.get_platform_name() != "aiocqhttp":
-            logger.debug(f"[Authenticator] 插件仅支持 aiocqhttp 平台启动验证流程，当前平台: {event.get_platform_name()}，跳过操作。")
+        adapter = self.platforms.for_event(event)
+        if adapter is None:
             return
-            
+        
+        # 重新入群的成员不再执行之前延后的踢出
+        if self._deferred_kicks.pop((str(gid), uid), None):
+            metrics.set_gauge("recaptcha.deferred_kicks", len(self._deferred_kicks))
+        
         if uid in self.pending:
             old_task = self.pending[uid].get("task")
             if old_task and not old_task.done():
                 old_task.cancel()
 
-        question, answer = self.generate_math_problem()
-        logger.info(f"[Authenticator] 为用户 {uid} 在群 {gid} 生成验证问题: {question} (答案: {answer})。")
+        challenge = self._issue_challenge(uid, gid)
+        question, answer = challenge.question, challenge.answer
+        logger.info(f"[Authenticator] 为用户 {uid} 在群 {gid} 生成验证问题: {challenge.text} (答案: {answer})。")
 
         nickname = uid
-        try:
-            user_info = await event.bot.api.call_action("get_group_member_info", group_id=gid, user_id=int(uid))
-            nickname = user_info.get("card", "") or user_info.get("nickname", uid)
-        except Exception as e:
-            logger.warning(f"[Authenticator] 获取用户 {uid} 昵称失败: {e}")
+        if not batch:
+            try:
+                user_info = await adapter.get_group_member_info(gid, int(uid))
+                nickname = user_info.get("card", "") or user_info.get("nickname", uid)
+            except Exception as e:
+                # 协议端不可用时降级为使用用户ID作为昵称
+                logger.warning(f"[Authenticator] 获取用户 {uid} 昵称失败: {type(e).__name__} {e}")
 
-        task = asyncio.create_task(self.timeout_kick(event.bot, uid, gid, nickname))
+        task = asyncio.create_task(self.timeout_kick(adapter, uid, gid, nickname))
         self.pending[uid] = {"gid": gid, "answer": answer, "task": task}
 
+        if batch and is_new_member:
+            self._queue_batched_prompt(adapter, uid, gid, question)
+            return
+
         at_user = f"[CQ:at,qq={uid}]"
+        profile = self.profiles.get(gid)
         
         format_args = {
             "at_user": at_user,
             "member_name": nickname,
             "question": question,
-            "timeout": self.verification_timeout // 60,
-            "countdown": self.kick_delay
+            "timeout": profile.verification_timeout // 60,
+            "countdown": profile.kick_delay
         }
         
         if is_new_member:
-            prompt_message = safe_format(self.new_member_prompt, **format_args)
+            prompt_message = safe_format(profile.new_member_prompt, **format_args)
         else:
-            prompt_message = safe_format(self.wrong_answer_prompt, **format_args)
+            prompt_message = safe_format(profile.wrong_answer_prompt, **format_args)
 
-        await event.bot.api.call_action("send_group_msg", group_id=gid, message=prompt_message)
+        await self._send_group_msg(adapter, gid, prompt_message, "验证问题")
+    
+    def _issue_challenge(self, uid: str, gid: int) -> Challenge:
+        """
+        为成员生成验证问题，开启事件录制时一并录制，以便回放时还原
+        
+        Args:
+            uid: 用户ID
+            gid: 群ID
+        
+        Returns:
+            验证问题
+        """
+        challenge = self.challenge_generator.generate()
+        if self.capture is not None:
+            self.capture.record_challenge(uid, gid, challenge.text, challenge.answer)
+        return challenge
+    
+    def _queue_batched_prompt(self, adapter, uid: str, gid: int, question: str):
+        """
+        将验证问题加入合并发送队列
+        
+        Args:
+            adapter: 协议端适配器
+            uid: 用户ID
+            gid: 群ID
+            question: 验证问题
+        """
+        self._prompt_batches.setdefault(gid, []).append((uid, question))
+        task = self._batch_tasks.get(gid)
+        if task is None or task.done():
+            self._batch_tasks[gid] = asyncio.create_task(self._flush_prompt_batch(adapter, gid))
+    
+    async def _flush_prompt_batch(self, adapter, gid: int):
+        """
+        等待合并间隔后，将该群累积的验证问题合并为一条消息发送
+        
+        Args:
+            adapter: 协议端适配器
+            gid: 群ID
+        """
+        try:
+            await asyncio.sleep(self.batch_interval)
+        except asyncio.CancelledError:
+            self._prompt_batches.pop(gid, None)
+            return
+        finally:
+            self._batch_tasks.pop(gid, None)
+        
+        # 仅保留仍在等待验证的成员，已离开或已重新出题的成员不再提示
+        entries = [
+            (uid, question) for uid, question in self._prompt_batches.pop(gid, [])
+            if uid in self.pending and self.pending[uid]["gid"] == gid
+        ]
+        if not entries:
+            return
+        
+        timeout = self.profiles.get(gid).verification_timeout // 60
+        for chunk in self._split_prompt_batch(entries):
+            questions = "\n".join(f"[CQ:at,qq={uid}] {question}" for uid, question in chunk)
+            batch_msg = safe_format(self.batch_prompt, questions=questions, count=len(chunk), timeout=timeout)
+            if await self._send_group_msg(adapter, gid, batch_msg, "合并验证消息"):
+                logger.info(f"[Authenticator] 已向群 {gid} 合并发送 {len(chunk)} 名新成员的验证问题。")
+    
+    @staticmethod
+    def _split_prompt_batch(entries: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        """
+        将待合并的验证问题分组，每组包含的图片验证码不超过 BATCH_PROMPT_IMAGE_LIMIT 张；
+        纯文本验证问题不受限制，始终合并为一组
+        
+        Args:
+            entries: [(用户ID, 验证问题)]
+        
+        Returns:
+            分组后的验证问题，每组合并为一条消息发送
+        """
+        chunks: List[List[Tuple[str, str]]] = [[]]
+        images = 0
+        for uid, question in entries:
+            count = question.count("[CQ:image")
+            if chunks[-1] and images + count > BATCH_PROMPT_IMAGE_LIMIT:
+                chunks.append([])
+                images = 0
+            chunks[-1].append((uid, question))
+            images += count
+        return chunks
     
     async def process_verification_message(self, event: AstrMessageEvent):
         """
@@ -231,11 +563,6 @@ class ReCAPTCHA:
         Args:
             event: 消息事件
         """
-        # 检查是否为aiocqhttp平台
-        if event.get_platform_name() != "aiocqhttp":
-            logger.debug(f"[Authenticator] 插件仅支持 aiocqhttp 平台处理验证消息，当前平台: {event.get_platform_name()}，返回验证失败。")
-            return
-            
         uid = str(event.get_sender_id())
         if uid not in self.pending:
             return
@@ -254,6 +581,8 @@ class ReCAPTCHA:
             return
         
         text_without_at = re.sub(r'\[CQ:at,qq=\d+\]', '', event.message_str).strip()
+        # 规范化全角数字并去除夹在数字间的不可见字符
+        text_without_at = self.normalizer.normalize(text_without_at)
         numbers_found = re.findall(r'\d+', text_without_at)
         
         if not numbers_found:
@@ -274,11 +603,11 @@ class ReCAPTCHA:
             nickname = raw.get("sender", {}).get("card", "") or raw.get("sender", {}).get("nickname", uid)
             
             welcome_msg = safe_format(
-                self.welcome_message, 
+                self.profiles.get(gid).welcome_message, 
                 at_user=f"[CQ:at,qq={uid}]", 
                 member_name=nickname
             )
-            await event.bot.api.call_action("send_group_msg", group_id=gid, message=welcome_msg)
+            await self._send_group_msg(self.platforms.for_event(event), gid, welcome_msg, "验证成功提示")
             event.stop_event()
         else:
             logger.info(f"[Authenticator] 用户 {uid} 在群 {gid} 回答错误。重新生成问题。")
@@ -292,7 +621,10 @@ class ReCAPTCHA:
         Args:
             event: 消息事件
         """
-        uid = str(event.message_obj.raw_message.get("user_id"))
+        raw = event.message_obj.raw_message
+        uid = str(raw.get("user_id"))
+        if self._deferred_kicks.pop((str(raw.get("group_id")), uid), None):
+            metrics.set_gauge("recaptcha.deferred_kicks", len(self._deferred_kicks))
         if uid in self.pending:
             self.pending[uid]["task"].cancel()
             self.pending.pop(uid, None)
@@ -304,4 +636,23 @@ class ReCAPTCHA:
             task = data.get("task")
             if task and not task.done():
                 task.cancel()
-        self.pending.clear()
\ No newline at end of file
+        self.pending.clear()
+        
+        for task in self._batch_tasks.values():
+            if not task.done():
+                task.cancel()
+        self._batch_tasks.clear()
+        self._prompt_batches.clear()
+        
+        for task in self._expiry_tasks.values():
+            if not task.done():
+                task.cancel()
+        self._expiry_tasks.clear()
+        self._expired_batches.clear()
+        
+        self.challenge_generator.shutdown()
+        
+        if self._kick_retry_task and not self._kick_retry_task.done():
+            self._kick_retry_task.cancel()
+        self._kick_retry_task = None
+        self._deferred_kicks.clear()
\ No newline at end of file